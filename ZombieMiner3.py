@@ -131,13 +131,73 @@ Revision History:
 3.012  Aug 16th, 2013
     - officially version 3.0. changing to zombieminer3.py
     - FULL SCREEEEEEN!!!!!
+
+3.013  Oct 18th, 2026
+    - tilemap only draws the tiles that are on screen (works out the visible rows/cols from the map shift) instead of checking every tile
+      ...mobs are kept in a spatial lookup on the tilemap (cells of MOB_CELL_SIZE tiles) so only mobs near the screen get drawn
+      ...benchmark mode (--bench on the command line) times drawing the map on 40x40 up to 1000x1000 maps (BENCH_MAP_SIZES) to check it
+    - tilemap is drawn from pre-rendered chunks (MAP_CHUNK_SIZE tiles square) instead of tile by tile
+      ...tiles tell the tilemap when they change (hit/change), and only those tiles get redrawn onto their chunk
+    - game loop is capped at GAME_FPS frames per second, and game logic runs in fixed SIM_TICK ticks of simulation time (SimClock)
+      ...miners/mobs animate off the simulation time passed in, instead of pygame.time.get_ticks(), so the game plays the same on any machine
+    - headless mode (--headless on the command line) - simulates games with SDL's dummy drivers, no drawing/sound, and a ScriptedInput player
+      ...game() takes an input source, headless flag and tick limit, and now returns how the game ended and how long it took
+    - fog of war reuses one fow image, and the faded vision circle is pre-rendered once per vision range (getVisionMask)
+      ...drawing the fow is now a fill and a blit, no matter how big the players vision gets
+    - changeBrightness uses numpy (if its installed) to change the whole image at once. added tintImage/tintedImage to gameFunctions for general tinting
+    - sounds are loaded once into a sound bank (loadSound/loadSounds) instead of from disk every time they play
+      ...sound fx play on a limited number of channels (SND_CHANNELS), and the same sound can't play again within SND_MIN_DELAY
+    - stat window is created once per game and updated (updateStatWin) - labels only re-render when their text changes, and the player image is only loaded once
+    - tilemap stores its tiles compactly - flat arrays of mine ids and hp, instead of a Tile object with its own copy of the mine attributes per tile
+      ...tiles (getTile) are now just views onto the tilemap. added getType/setTile/getNearTypes to the tilemap, and the AI chooses off tile types
+      ...handlePlayer/handleZombies/teleport/createZombies/setWinningTile no longer need the tileset
+    - BETTER AI! zombies follow a flow field (FlowField) built out from the players tile - the cheapest way to the player, counting
+      ...the hp of tiles that have to be dug through (ghosts just go straight through). only rebuilt when the player changes tiles or the map changes,
+      ...so every zombie gets its direction with a single lookup. zombies fall back to the old "head towards the player" AI outside of the field
+    - handleZombies asks the tilemaps mob lookup which zombies are touching/in range of the player (getMobsAt/getMobsInRange),
+      ...instead of checking the distance from every zombie to the player. removed inRange()
+    - zombies are updated in tiers - every tick within ZOMBIE_AI_RANGE of the player, every ZOMBIE_MID_TICKS ticks out to ZOMBIE_WAKE_RANGE,
+      ...and not at all past that (they sleep until the player comes near), so handleZombies only costs as much as the zombies near the player
+      ...added tilemap.removeMob to remove a mob without needing its index
+    - with MOB_STORE_MIN zombies or more (and numpy installed), zombies are updated all at once in a MobStore - their positions, frames, timers and acts
+      ...are kept in numpy arrays, so animating/moving every zombie is a few array operations a tick. handleZombieAct handles what a zombie did either way
+    - spritesets are shared (getSpriteSet) - every zombie of a type (and every game) uses the same frames, instead of loading and splitting up
+      ...a new spriteset per zombie. miners don't copy their starting image anymore either (Drawable copyImg flag)
+    - images are only ever loaded once (loadImage keeps an image cache), and imagesets are shared too (getImageSet)
+      ...the splash screen preloads all the images (PRELOAD_IMGS) and sounds and prints how long they took, instead of just spinning for SPLASH_DELAY
+    - images are converted to the displays pixel format once the display is set (convertDisplay), so blits don't convert pixel by pixel every frame
+      ...keeps colorkeys (and RLE) or per-pixel alpha. imagesets/spritesets are re-split from the converted images, and windows convert their contents
+    - rendered text is kept in an LRU text cache (TEXT_CACHE_SIZE) in textImage, so the same text is only ever rendered once. counts cache hits/misses
+    - windows lay themselves (and their labels/buttons) out once per screen size (Window.layout) instead of re-aligning everything on every draw/click
+      ...labels tell their window to lay out again when their size changes, so re-sized centered labels stay centered
+    - windows draw everything in them onto one image (Window.compose) and only redraw it when a label, button or layout changes,
+      ...so a window is one blit a frame instead of a blit per panel/label/button/image
+    - only the parts of the display that changed get updated each frame (DirtyRects, DIRTY_RECTS) - drawables/windows report what changed
+      ...since they were last drawn, the tilemap adds tiles that changed and sprites that went off screen. full flip whenever the map scrolls
+    - nothing gets redrawn once the game is over unless theres input, and the menu is only redrawn when its window changes
+    - the menu waits on events (pygame.event.wait) instead of polling, so it uses no cpu while idle. the splash screen shows a
+      ...loading bar while preloading (drawLoadingBar) and waits out the rest of its delay on a timer event, still handling quit
+    - randomMapTemplate picks tiles with a lookup table of every possible roll (chanceTable) instead of walking the tile chances for every tile,
+      ...and looks the whole map up at once with numpy if its installed. maps can be given a seed - the same seed makes the same map (numpy or not)
+    - levels are generated from a seed (GAME_OPT_SEED level option, or --seed on the command line) with their own random number generator
+      ...for the map, zombies and winning tile, so the same seed always makes the same level. teleporting uses a separate one (TileMap.rng)
+      ...simulated games print the seed they were played on
+    - tilemap.randomPos picks straight from the tiles its allowed to (CandidateSet per start position, kept up to date by setTile)
+      ...instead of guessing until it hits one. raises a ValueError if there aren't any, instead of looping forever
+    - levels from a chosen seed are cached in data/cache (levelCacheFile), as .npy files of the tile ids and zombie spawns, so they only
+      ...get generated once. game memory maps the cached tiles (with numpy - no numpy, no cache), and the TileMap builds straight from them
 """
 
 
 #import needed modules for pygame
-import pygame, sys, random, math
+import pygame, sys, os, random, argparse, time
 from pygame.locals import *
 
+#headless and benchmark modes (see simulate() and benchmark()) - SDL has to be told to use its dummy video and audio drivers before pygame is initialized
+if ("--headless" in sys.argv or "--bench" in sys.argv):
+    os.environ["SDL_VIDEODRIVER"]="dummy"
+    os.environ["SDL_AUDIODRIVER"]="dummy"
+
 #initialize pygame, fonts, and the sound mixer
 pygame.init()
 pygame.font.init()
@@ -153,11 +213,17 @@ from gameObjects import *
 #                                           OBJECT CONSTANTS
 #=======================================================================================================================
 #windows image set for drawing windows
-WINSET = ImageSet(IMG_WINSET,WINSET_PNLSIZE,TILE_TRANSCOLOR)
+WINSET = getImageSet(IMG_WINSET,WINSET_PNLSIZE,TILE_TRANSCOLOR)
 #button imageset for drawing buttons
-BTNSET=ImageSet(IMG_BTNSET,BTNSET_PNLSIZE,TILE_TRANSCOLOR)
+BTNSET=getImageSet(IMG_BTNSET,BTNSET_PNLSIZE,TILE_TRANSCOLOR)
 #tile imageset for drawing game tiles (mines) - uptop because its needed for both game and 
-TILESET = ImageSet(IMG_TILESET,TILE_SIZE,TILE_TRANSCOLOR)
+TILESET = getImageSet(IMG_TILESET,TILE_SIZE,TILE_TRANSCOLOR)
+#the players image for the stat window - shrunk down to fit the window
+STAT_PLAYER_IMG = pygame.transform.scale(getImageSet(IMG_PLAYER,SPRITE_SIZE,TILE_TRANSCOLOR)[0],(40,40))
+
+#fog of war caches - pre-rendered vision masks (vision range:Surface) and the fow image itself (screen size:Surface)
+VISION_MASKS = dict()
+FOW_IMGS = dict()
 
 
 #========================================================================================
@@ -214,10 +280,10 @@ HOW_MECH_WIN=Window((ALIGN_CENTER,ALIGN_CENTER),
                     WINSET,len(HOW_MECH_LBLS[0].text.split(LBL_LINE_DLIM))+1,HOW_MECH_TITLE,HOW_MECH_LBLS,HOW_MECH_BTNS)
 
 # ui elements for the zombies window
-HOW_ZOMBIE_IMGS= [Drawable((50,45),ImageSet(IMG_ZOMBIE_EZ,   SPRITE_SIZE,TILE_TRANSCOLOR)[0]),
-                  Drawable((50,130),ImageSet(IMG_ZOMBIE_MED,  SPRITE_SIZE,TILE_TRANSCOLOR)[0]),
-                  Drawable((50,215),ImageSet(IMG_ZOMBIE_HARD, SPRITE_SIZE,TILE_TRANSCOLOR)[0]),
-                  Drawable((50,300),ImageSet(IMG_ZOMBIE_EXTREME, SPRITE_SIZE,TILE_TRANSCOLOR)[0])]       
+HOW_ZOMBIE_IMGS= [Drawable((50,45),getImageSet(IMG_ZOMBIE_EZ,   SPRITE_SIZE,TILE_TRANSCOLOR)[0]),
+                  Drawable((50,130),getImageSet(IMG_ZOMBIE_MED,  SPRITE_SIZE,TILE_TRANSCOLOR)[0]),
+                  Drawable((50,215),getImageSet(IMG_ZOMBIE_HARD, SPRITE_SIZE,TILE_TRANSCOLOR)[0]),
+                  Drawable((50,300),getImageSet(IMG_ZOMBIE_EXTREME, SPRITE_SIZE,TILE_TRANSCOLOR)[0])]       
 HOW_ZOMBIES_LBLS=[Label((100,45), HOW_ZOMBIES_EZ_TXT,     WIN_FONT,WIN_FONT_COLOR,LBL_LINE_DLIM),
                   Label((100,130),HOW_ZOMBIES_MED_TXT,    WIN_FONT,WIN_FONT_COLOR,LBL_LINE_DLIM),
                   Label((100,215),HOW_ZOMBIES_HARD_TXT,   WIN_FONT,WIN_FONT_COLOR,LBL_LINE_DLIM),
@@ -229,28 +295,64 @@ HOW_ZOMBIES_WIN =Window((ALIGN_CENTER,ALIGN_CENTER),
                         WINSET,len(HOW_ZOMBIES_LBLS[0].text.split(LBL_LINE_DLIM))+12,HOW_ZOMBIES_TITLE,HOW_ZOMBIES_LBLS,HOW_ZOMBIES_BTNS,HOW_ZOMBIE_IMGS)
 
 
+#all of the static windows above
+STATIC_WINS=[SHOP_WIN,MENU_WIN,LVL_WIN,HOW_WIN,HOW_MECH_WIN,HOW_ZOMBIES_WIN]
+
+#converts all of the games images (cached images, image/spritesets, and the static windows) to the pixel format of the display,
+#...so they don't have to be converted every time they're drawn. needs to be called whenever the display mode is set
+def convertDisplay():
+    global STAT_PLAYER_IMG
+    
+    #if the images were already converted for this display, theres nothing to do
+    if (not convertImages()):
+        return
+    
+    reloadImageSets()
+    STAT_PLAYER_IMG=convertImage(STAT_PLAYER_IMG)
+    for win in STATIC_WINS:
+        win.convert()
+
+
 #=======================================================================================================================
 #                             DYNAMIC WINDOW FUNCTIONS
 #=======================================================================================================================
 
+#gets the text for each of the labels in the players statistics window (in the same order as the labels)
+# player (Miner) - the player
+#returns - list of label text
+def statTexts(player):
+    return ["x " + str(player.stats[STAT_HP]),
+            "Power: " + str(player.stats[STAT_STR]),
+            "Speed : " + str(player.stats[STAT_SP]),
+            "Bag  : " + str(len(player.stats[STAT_BAG])) + " / " + str(player.stats[STAT_MAXBAG]),
+            "Cash: " + str(player.stats[STAT_MONEY])]
+
 #creates the players statistics window
 # player (Miner) - the player
 #returns - the statistics window
 def createStatWin(player):
+    texts=statTexts(player)
+    
     #ui elements for stats window
-    statImgs= [Drawable((30,5),pygame.transform.scale(ImageSet(IMG_PLAYER,SPRITE_SIZE,TILE_TRANSCOLOR)[0],(40,40)))] #shrinks the players image to fit the window
-    statLbls = [Label((65,15),"x " + str(player.stats[STAT_HP]),WIN_STAT_FONT,WIN_FONT_COLOR),
-                Label((120,5),"Power: " + str(player.stats[STAT_STR]),WIN_STAT_FONT,WIN_FONT_COLOR),
-                Label((120,25),"Speed : " + str(player.stats[STAT_SP]),WIN_STAT_FONT,WIN_FONT_COLOR),
-                Label((250,5), "Bag  : " + str(len(player.stats[STAT_BAG])) + " / " + str(player.stats[STAT_MAXBAG]),
-                      WIN_STAT_FONT,WIN_FONT_COLOR),
-                Label((250,25),"Cash: " + str(player.stats[STAT_MONEY]),WIN_STAT_FONT,WIN_FONT_COLOR)]
+    statImgs= [Drawable((30,5),STAT_PLAYER_IMG)]
+    statLbls = [Label((65,15),texts[0],WIN_STAT_FONT,WIN_FONT_COLOR),
+                Label((120,5),texts[1],WIN_STAT_FONT,WIN_FONT_COLOR),
+                Label((120,25),texts[2],WIN_STAT_FONT,WIN_FONT_COLOR),
+                Label((250,5),texts[3],WIN_STAT_FONT,WIN_FONT_COLOR),
+                Label((250,25),texts[4],WIN_STAT_FONT,WIN_FONT_COLOR)]
     
     #create the stat window
     statWin = Window((ALIGN_CENTER,ALIGN_BOTTOM),WINSET,0,None,statLbls,None,statImgs)
     
     return statWin
 
+#updates the players statistics window - only the labels whose stats have actually changed get re-rendered
+# statWin (Window) - the statistics window (from createStatWin)
+# player (Miner) - the player
+def updateStatWin(statWin,player):
+    for label,text in zip(statWin.labels,statTexts(player)):
+        label.change(text)
+
 
 #creates the end-game screen, win or lose
 # title (str) - the title for the window
@@ -371,6 +473,53 @@ def writeTimesFile(times):
     for lvl in times.keys():
         timeFile.write(lvl + TIME_DLIM + str(times[lvl]) + "\n")
 
+# gets the name a generated level is cached under (without the file extension) - the level name, map size and seed, plus a hash
+# of everything else that goes into generating it (the mines, the levels options and the aboveground map), so changing any of them
+# means the level gets generated again
+# level (str) - the game level
+# seed (int) - the seed the level is generated from
+# aboveground (list) - the aboveground map template
+# returns - the cache file name
+def levelCacheFile(level,seed,aboveground):
+    options=GAME_LVLS[level]
+    mapSize=options[GAME_OPT_MAP_SIZE]
+    levelHash=dataHash((LEVEL_CACHE_VERSION,mines,options,aboveground))
+    
+    return (LEVEL_CACHE_DIR + "".join(c for c in level if c.isalnum()) + "_" + str(mapSize[X]) + "x" + str(mapSize[Y]) +
+            "_" + str(seed) + "_" + levelHash[:12])
+
+# loads a cached level - the tile grid is memory mapped rather than read in, and the (tiny) zombie spawn list is just read in
+# cacheFile (str) - the levels cache file name (see levelCacheFile)
+# returns - tuple of the levels tile grid (2d numpy array of mine ids, row by row) and zombie tile positions (numpy array of x,y),
+#           or None if the level isn't cached
+def loadLevelCache(cacheFile):
+    try:
+        return (numpy.load(cacheFile + ".map.npy",mmap_mode='r'),numpy.load(cacheFile + ".mobs.npy"))
+    except (IOError,ValueError):
+        return None
+
+# caches a newly generated level, so it never has to be generated again - the tiles and zombie spawns are saved as .npy files
+# ...each is written to this processes own temporary file first, so a half-written level is never loaded (even with lots of
+# ...simulations caching the same level at once). the spawns are moved into place first, so once the tiles are there the level is complete
+# cacheFile (str) - the levels cache file name (see levelCacheFile)
+# tilemap (TileMap) - the levels tilemap, before anything has happened on it
+# zombies (list) - the levels zombies, before any of them have moved
+def saveLevelCache(cacheFile,tilemap,zombies):
+    grid=numpy.frombuffer(tilemap.ids.tostring(),numpy.uint8).reshape(tilemap.size[Y],tilemap.size[X])
+    spawns=numpy.array([zombie.getPos() for zombie in zombies],numpy.int32).reshape(-1,2)
+    
+    try:
+        if (not os.path.isdir(LEVEL_CACHE_DIR)):
+            os.makedirs(LEVEL_CACHE_DIR)
+        
+        #the spawns go first, as the level only counts as cached once the tiles are there
+        for (ext,data) in ((".mobs.npy",spawns),(".map.npy",grid)):
+            tempFile=cacheFile + ".tmp" + str(os.getpid()) + ext
+            numpy.save(tempFile,data)
+            os.rename(tempFile,cacheFile + ext)
+    except (IOError,OSError) as e:
+        print "couldn't cache the level: " + str(e)
+
 #========================================================================================
 #                         GAME SETUP FUNCTIONS
 #========================================================================================
@@ -378,21 +527,26 @@ def writeTimesFile(times):
 #creates the zombies!
 # zData (dict) - zombie data for the to-be-created zombies. contains img, stats, and number of zombies
 # tilemap (TileMap) - the tilemap to create the zombies on (only needed to replace tiles for zombie space)
-# tileset (ImageSet) - the tileset for the tilemap (again, only needed for replace tiles for zombie space)
 # spriteTemplate (3d list) - the sprite template for the zombies
 # player (Miner) - the player, AKA the zombies (ai's) target
 # startPos (tuple) - the start position on the tilemap to start allowing zombies (wont allow placement < startPos)
+# rng (Random) - the random number generator for the level (see game) - the tilemaps own one if not given
+# positions (iterator) - gives the tile position for each zombie, instead of choosing random ones (e.g. from the level cache)
 #returns - list of zombies!
-def createZombies(zData,tilemap,tileset,spriteTemplate,target,startPos=(0,0)):
-    zombieImg=loadImage(zData[ZOMBIE_IMG],TILE_TRANSCOLOR) #load spriteset image for zombies
-    zombieAI = AI(target) #setup a simple AI that targets the player
+def createZombies(zData,tilemap,spriteTemplate,target,startPos=(0,0),rng=None,positions=None):
+    zombieSprites=getSpriteSet(zData[ZOMBIE_IMG],SPRITE_SIZE,spriteTemplate,TILE_TRANSCOLOR) #get the (shared) spriteset for zombies
+    #setup a simple AI that targets the player, following the flow field for its type of zombie (ghosts dont have to dig)
+    zombieAI = AI(target,tilemap.getFlowField(zData[ZOMBIE_STATS][ZOMBIE_TYPE]==ZOMBIE_TYPE_EXTREME))
 
     zombies=list() #holder list for zombies
     
     #create given # of zombies
     for z in range(0,zData[GAME_OPT_ZOMBIE_NUM]):
-        #randomly choose a position for the zombie to start at
-        randomPos = tilemap.randomPos(startPos)
+        #randomly choose a position for the zombie to start at (unless its been given one)
+        if (positions):
+            randomPos = next(positions)
+        else:
+            randomPos = tilemap.randomPos(startPos,rng)
         
         zombieStats = zData[ZOMBIE_STATS].copy() #make a copy of the stats soas not to effect other zombies
         
@@ -402,11 +556,11 @@ def createZombies(zData,tilemap,tileset,spriteTemplate,target,startPos=(0,0)):
                 zombieStats[stat]=zombieStats[stat]*(randomPos[X]+randomPos[Y])/3
         
         #create a new zombie and add it to the list of zombies
-        zombie = Mob(randomPos,SpriteSet(zombieImg,SPRITE_SIZE,spriteTemplate),zombieStats,zombieAI)
+        zombie = Mob(randomPos,zombieSprites,zombieStats,zombieAI)
         zombies.append(zombie)
         
         #change the tile to be a "dug" one at the randomly chosen position
-        tilemap.getTile(randomPos).change(mines[MINE_DUG],tileset[MINE_DUG])
+        tilemap.setTile(randomPos,MINE_DUG)
     
     return zombies
     
@@ -415,13 +569,13 @@ def createZombies(zData,tilemap,tileset,spriteTemplate,target,startPos=(0,0)):
 #NOTE!! ONLY EVER CALL THIS FUNCTION ONCE! otherwise redo tilemap.randomPos logic
 # pos (tuple) - the position to set the winning tile to
 # tilemap (TileMap) - tilemap to place the mine on
-# tileset (TileSet) - the tileset to choose the mine from
 # startPos (tuple) - the start position on the tilemap to start allowing zombies (wont allow placement < startPos), e.g. the aboveground area
-def setWinningTile(pos,tilemap,tileset,startPos=(0,0)):
+# rng (Random) - the random number generator for the level (see game) - the tilemaps own one if not given
+def setWinningTile(pos,tilemap,startPos=(0,0),rng=None):
     (tileX,tileY)=pos
     
     #generate a random position incase its needed
-    randPos=tilemap.randomPos(startPos)
+    randPos=tilemap.randomPos(startPos,rng)
     
     #if either of the positions is set w/ the random position flag, randomize its position!
     if(pos[X]==WIN_POS_RAND):
@@ -430,7 +584,7 @@ def setWinningTile(pos,tilemap,tileset,startPos=(0,0)):
         tileY=randPos[Y]
         
     #replace the tile with the winning tile
-    tilemap.getTile((tileX,tileY)).change(mines[MINE_WIN],tileset[MINE_WIN])
+    tilemap.setTile((tileX,tileY),MINE_WIN)
 
 
 #========================================================================================
@@ -469,15 +623,16 @@ def tryAction(screen,miner,direction,tilemap,ignoreType=False):
                 return nextTile
         else:
             #if new direction next tileis blocked...
-            if(nextTile.attributes[ATTR_TYPE]==MINE_BLOCK_FULL):
+            nextType=tilemap.getType(nextPos)
+            if(nextType==MINE_BLOCK_FULL):
                 return None #can't walk in that direction
             
             #if new direction is up, but up is blocked...
-            elif (direction==DIR_UP and tilemap.getTile(nextPos).attributes[ATTR_TYPE]==MINE_BLOCK_UP):
+            elif (direction==DIR_UP and nextType==MINE_BLOCK_UP):
                 return None #can't act in that direction
             
             #if the new direction is diggable
-            elif (nextTile.attributes[ATTR_TYPE]==MINE_DIGGABLE):
+            elif (nextType==MINE_DIGGABLE):
                 if(miner.doAction(ACT_DIG)): #dig it and return the tile being dug
                     return nextTile
             
@@ -513,69 +668,91 @@ def buyStat(player,stat,cost):
     else:
         return False
 
+#gets the pre-rendered "fading" vision circle for a vision range, creating it the first time that range is asked for
+#...its a square fog of war image (darkness!) with the faded circle cut out of the middle, so it can just be blitted onto the fow
+# visionRange (int) - the radius of the vision circle
+#returns - the vision mask (Surface)
+def getVisionMask(visionRange):
+    if (visionRange not in VISION_MASKS):
+        radius=int(visionRange)
+        maskImg=pygame.Surface((radius*2+1,radius*2+1),pygame.SRCALPHA)
+        maskImg.fill(Color(0,0,0,FADE_MAX_ALPHA))
+        
+        alpha=FADE_MAX_ALPHA
+        steps=0 #no fading steps
+        
+        #loop through each fading step of the circle fade until its untirely faded (base circle, faded ring, more faded ring, etc until black)
+        while alpha>=FADE_MIN_ALPHA:
+            #determine the vision radius based on the players vision & current fade step
+            visionRadius=visionRange-steps*FADE_STEP_DIST
+            if visionRadius<0:
+                visionRadius=0
+            
+            #draw the players immediate vision (alpha=0)
+            pygame.draw.circle(maskImg,Color(0,0,0,alpha),(radius,radius),int(visionRadius))
+            
+            alpha-=FADE_STEP_ALPHA
+            steps+=1
+        
+        VISION_MASKS[visionRange]=maskImg
+    
+    return VISION_MASKS[visionRange]
+
 #draws a "fading" vision circle around the player
 # fowImg (Surface) - the fog of war mask-image (darkness!) to draw the vision circle to
 # tilemap (TileMap) - tilemap to mask with fog of war
 # player (Miner) - the player whoms vision is being drawn
+#returns - the area of the fow the vision circle was drawn to (Rect)
 def drawVision(fowImg,tilemap,player):
-    vision=(player.pos[X]+VISION_OFFSET[X],player.pos[Y]+VISION_OFFSET[Y],player.stats[STAT_RANGE])
-    alpha=FADE_MAX_ALPHA
-    steps=0 #no fading steps
-
-    #loop through each fading step of the circle fade until its untirely faded (base circle, faded ring, more faded ring, etc until black)
-    while alpha>=FADE_MIN_ALPHA:
-        #determine the vision radius based on the players vision & current fade step
-        visionRadius=vision[R]-steps*FADE_STEP_DIST
-        if visionRadius<0:
-            visionRadius=0
-        
-        #draw the players immediate vision (alpha=0)
-        pygame.draw.circle(fowImg,Color(0,0,0,alpha),
-                           (int(vision[X]+tilemap.shift[X]),
-                            int(vision[Y]+tilemap.shift[Y])),
-                           int(visionRadius))
-        
-        alpha-=FADE_STEP_ALPHA
-        steps+=1
+    maskImg=getVisionMask(player.stats[STAT_RANGE])
+    radius=maskImg.get_width()/2
+    
+    #center the mask on the player - keeping the lowest alpha of the two, so it only ever cuts vision out of the fow
+    maskPos=(int(player.pos[X]+VISION_OFFSET[X]+tilemap.shift[X])-radius,int(player.pos[Y]+VISION_OFFSET[Y]+tilemap.shift[Y])-radius)
+    return fowImg.blit(maskImg,maskPos,None,BLEND_RGBA_MIN)
             
 #draws the "Fog of war" around the player
 # screen (display) - the screen to draw the fog of war to
 # tilemap (TileMap) - tilemap to mask with fog of war
 # player (Miner) - the player whoms vision is being drawn
 # clearings (list) - a list of Rect (x,y,l,w) or "Circle (x,y,radius) tuples to draw free of fog of war
+#returns - the area of the screen the players vision circle is in (Rect) - the only part of the fow that moves without the map scrolling
 def drawFOW(screen,tilemap,player,clearings=None):
-    #create a new surface to paint the fow onto
-    fowImg = pygame.Surface(screen.get_size())
-    fowImg=fowImg.convert_alpha()
-    fowImg.fill(Color(0,0,0,255))
+    #get the surface to paint the fow onto (only created once per screen size), and black it out
+    if (screen.get_size() not in FOW_IMGS):
+        FOW_IMGS[screen.get_size()]=pygame.Surface(screen.get_size(),pygame.SRCALPHA)
+    fowImg=FOW_IMGS[screen.get_size()]
+    fowImg.fill(Color(0,0,0,FADE_MAX_ALPHA))
     
     #draw the circle around the player - MUST be called before other clearings, as the fade messes with things
-    drawVision(fowImg,tilemap,player)
+    visionRect=drawVision(fowImg,tilemap,player)
     
     #if theres any "clearings" (fow-clear areas), loop through the areas and clear them of FOW
     if(clearings):
         for area in clearings:
-            for area in clearings:
-                if (len(area)==3):
-                    #draw a circle
-                    pygame.draw.circle(fowImg,Color(0,0,0,0),(area[X]+tilemap.shift[X],area[Y]+tilemap.shift[Y]),area[R])
-                if (len(area)==4):
-                    #draw a rectangle
-                    pygame.draw.rect(fowImg,Color(0,0,0,0),(area[X]+tilemap.shift[X],area[Y]+tilemap.shift[Y],area[W],area[H]))
+            if (len(area)==3):
+                #draw a circle
+                pygame.draw.circle(fowImg,Color(0,0,0,0),(area[X]+tilemap.shift[X],area[Y]+tilemap.shift[Y]),area[R])
+            if (len(area)==4):
+                #clear a rectangle (clipped to the fow image first - fill doesn't handle rects hanging off the top/left very well)
+                clearRect=Rect(area[X]+tilemap.shift[X],area[Y]+tilemap.shift[Y],area[W],area[H]).clip(fowImg.get_rect())
+                fowImg.fill(Color(0,0,0,0),clearRect)
     
     #draw the fow image to the screen
     screen.blit(fowImg,(0,0))
+    
+    return visionRect
 
 
 #handles the player-updating part of the game loop. checks for any performed actions, executes them, and processes the results
 # screen (display) - the screen being drawn to
 # tilemap (TileMap) - the tilemap being used currently
-# tileset (TileSet) - the tileset being used currently
 # player (Miner) - the player
+# now (int) - the current simulation time (ms)
 #returns - None or a Window obj if the game was won or the players stats need updating
-def handlePlayer(screen,tilemap,tileset,player):
+def handlePlayer(screen,tilemap,player,now):
     #update the player and get the returned action data
-    playerAct=player.update()
+    playerAct=player.update(now)
     
     #if the finished act is a tuple (e.g. a move vector)
     if (type(playerAct) is tuple):
@@ -593,7 +770,7 @@ def handlePlayer(screen,tilemap,tileset,player):
         #if the hit returned a result (broke?)
         if(pHitResult!=None):
             playSound(SND_BREAK) #play the breaking sound
-            pHitTile.change(mines[MINE_DUG],tileset[MINE_DUG]) #set the dug-out tiles attributes and image to "dug" tile
+            pHitTile.change(MINE_DUG) #set the dug-out tile to "dug" tile
             
             #if the player just broke the winning mine, show the winning game screen
             if(pHitResult==MINE_VAL_WIN):
@@ -602,7 +779,7 @@ def handlePlayer(screen,tilemap,tileset,player):
             else: #otherwise, if it was a normal tile...
                 #try to add the tiles value to the players bag, if it was worth something...
                 if(player.addToBag(pHitResult)): 
-                    pygame.mixer.Sound(SND_MINE).play() #play money sounds!
+                    playSound(SND_MINE) #play money sounds!
                     return WIN_STAT #create a new stat window (basically an update, but i never wrote an update)
     
     return None
@@ -616,14 +793,14 @@ def handlePlayer(screen,tilemap,tileset,player):
 # miner (Miner) - the miner to teleport
 # pos (tuple) - the position to teleport to
 # tilemap (TileMap) - the tilemap, to check for any tiles we may have been placed on
-def teleport(miner,pos,tilemap,tileset):
+def teleport(miner,pos,tilemap):
     #move the miner
     miner.setPos(pos)
     
     #if the tilemap is a "diggable" tile (this *shouldn't* ever result in people being placed on blocked tiles due to preprocessing)
-    if(tilemap.getTile(pos).attributes[ATTR_TYPE]==MINE_DIGGABLE):
+    if(tilemap.getType(pos)==MINE_DIGGABLE):
         #replace the tile in that pos with a "dug" tile
-        tilemap.getTile(pos).change(mines[MINE_DUG],tileset[MINE_DUG]) 
+        tilemap.setTile(pos,MINE_DUG)
         
     #cancel any action
     miner.frame=0
@@ -636,10 +813,9 @@ def teleport(miner,pos,tilemap,tileset):
 # screen - screen being drawn to
 # player - player to teleport
 # tilemap - the tilemap the player is being teleported on
-# tileset - the game tilset, incase we need to change any tiles
-def teleportHome(screen,player,tilemap,tileset):
+def teleportHome(screen,player,tilemap):
     #send home
-    teleport(player,PLAYER_STARTPOS,tilemap,tileset) #teleport player home
+    teleport(player,PLAYER_STARTPOS,tilemap) #teleport player home
     tilemap.shift=(0,0) #bug fix for overscrolling
     scrollMap(screen,player,tilemap) # center map on player
 
@@ -647,60 +823,78 @@ def teleportHome(screen,player,tilemap,tileset):
 # screen - screen being drawn to
 # player - player to teleport
 # tilemap - the tilemap the player is being teleported on
-# tileset - the game tilset, incase we need to change any tiles
-def teleportRandom(screen,player,tilemap,tileset):
+def teleportRandom(screen,player,tilemap):
     #get random pos to teleport player to (will only pick valid, diggable, non-winning tiles)
     randPos=tilemap.randomPos()
     #teleport player to that pos & scroll map
-    teleport(player,randPos,tilemap,tileset)
+    teleport(player,randPos,tilemap)
     scrollMap(screen,player,tilemap) # center map on player
 
-#checks if two miners are "within range" of eachother
-# miner1 (Miner) - the first miner
-# miner2 (Miner) - the second miner
-# rangeDist (int) - the range threshold to qualify as "in" or "out" of range 
-#returns - true if in range of eachother, false otherwise
-def inRange(miner1,miner2,rangeDist):
-    #get the rise and run difference between the miners positions
-    diffX=miner1.getPos()[X]-miner2.getPos()[X]
-    diffY=miner1.getPos()[Y]-miner2.getPos()[Y]
-    
-    #pythagorean theorum to get distance between two miners positions
-    dist=math.sqrt(math.pow(diffX,2)+math.pow(diffY,2))
-    
-    #if its within range, return true. otherwise false
-    if (dist<rangeDist):
-        return True
-    else:
-        return False
-    
+#handles whatever a zombie did when it was updated
+# tilemap (TileMap) - the tilemap being used currently
+# zombie (Mob) - the zombie that was updated
+# zombieAct - what the zombies update returned
+def handleZombieAct(tilemap,zombie,zombieAct):
+    #if the zombie moved, keep the tilemaps mob lookup up to date
+    if (type(zombieAct) is tuple):
+        tilemap.moveMob(zombie)
     
+    #if the zombie is hitting
+    elif (zombieAct==ACT_DIG):
+        zHitTile = zombie.actTile #get the tile the zombie is trying to hit
+        zHitResult = zHitTile.hit(zombie.stats[STAT_STR]) #hit it
+        
+        #if the hit returned a result (broke?)
+        if(zHitResult!=None):
+            #set the dug-out tile to a "dug" tile
+            zHitTile.change(MINE_DUG)
+
 #handles the zombie-updating part of the game loop. checks for any performs any zombie actions and processes the results
+#...only zombies near the player are handled - ones in AI range every tick, ones within ZOMBIE_WAKE_RANGE every ZOMBIE_MID_TICKS ticks,
+#...and any further away than that sleep (aren't touched) until the player comes near
 # screen (display) - the screen being drawn to
 # tilemap (TileMap) - the tilemap being used currently
-# tileset (TileSet) - the tileset being used currently
 # zombies (list) - a list of all of the zombies to handle
 # player (Miner) - the player that the zombies are after
 # deathSet (SpriteSet...more like an ImageSet) - the spriteset for the fire that kills the zombies (zombies death)
+# now (int) - the current simulation time (ms)
+# mobStore (MobStore) - the store to update all of the zombies at once with, if theres one
 #returns - None or a Window obj if the game was won or the players stats need updating
-def handleZombies(screen,tilemap,tileset,zombies,player,deathSet):
+def handleZombies(screen,tilemap,zombies,player,deathSet,now,mobStore=None):
     returnWin=None
     
-    #loop through each zombie to update
-    for z in range(0,len(zombies)):
-        zombie=zombies[z]
+    #look up the zombies touching, within range of, and awake around the player (their target) from the tilemaps mob lookup,
+    #instead of checking every zombie against the player
+    touching=tilemap.getMobsAt(player.pos)
+    nearZombies=set(tilemap.getMobsInRange(player.getPos(),ZOMBIE_AI_RANGE))
+    awakeZombies=tilemap.getMobsInRange(player.getPos(),ZOMBIE_WAKE_RANGE)
+    midTick=((now/SIM_TICK)%ZOMBIE_MID_TICKS==0) #whether the zombies outside of AI range get updated this tick
+    updated=set() #zombies already updated this tick (a teleport changes who's awake part way through)
+    acting=list() #the zombies to animate once they've all chosen what to do, in the order they were updated
+    
+    #loop through each awake zombie to update
+    i=0
+    while (i<len(awakeZombies)):
+        zombie=awakeZombies[i]
+        i+=1
+        
+        #skip zombies already updated this tick - and zombies outside of AI range only update every so often
+        if (zombie in updated or (not midTick and zombie not in nearZombies)):
+            continue
+        updated.add(zombie)
         
         #if the zombie is outside...
-        if (tilemap.getTile(zombie.getPos()).attributes['type']==MINE_BLOCK_UP):
+        if (tilemap.getType(zombie.getPos())==MINE_BLOCK_UP):
             #dying animation. when the animation is complete, remove the zombie from the tilemap and the game
-            if(zombie.dying(deathSet,SPRITE_MASK_DELAY)):
-                tilemap.clearMob(z)
+            if(zombie.dying(deathSet,SPRITE_MASK_DELAY,now)):
+                tilemap.removeMob(zombie)
                 zombies.remove(zombie)
-                break
+                if (mobStore):
+                    mobStore.remove(zombie)
             continue #go to next zombie!
         
         #otherwise if the zombie is touching the player - perform special zombie action!
-        elif (zombie.pos == player.pos):
+        elif (zombie in touching):
             player.subStat(STAT_HP,1) #always do dmg to the player
             playSound(SND_ZOMBIE) #play the zombie sound 
             
@@ -710,23 +904,23 @@ def handleZombies(screen,tilemap,tileset,zombies,player,deathSet):
                 player.stats[STAT_MONEY]=0 
                 player.clearBag() #steal players bag
                 player.subStat(STAT_HP,1) #take an additonal life
-                teleportHome(screen,player,tilemap,tileset) #teleport player home
+                teleportHome(screen,player,tilemap) #teleport player home
                          
             #if its a hard zombie, take hp and teleport random
             elif(zombie.stats[ZOMBIE_TYPE]==ZOMBIE_TYPE_HARD):
                 player.clearBag() #steal players bag
-                teleportRandom(screen,player,tilemap,tileset) #teleport player randomly
+                teleportRandom(screen,player,tilemap) #teleport player randomly
             
             #if its a mediun zombie, steal the players cash and bag
             elif(zombie.stats[ZOMBIE_TYPE]==ZOMBIE_TYPE_MED):
                 player.stats[STAT_MONEY]=0
                 player.clearBag() #steal players bag
-                teleportHome(screen,player,tilemap,tileset) #send player home
+                teleportHome(screen,player,tilemap) #send player home
             
             #if its an easy zombie, steal the bag and send player
             elif (zombie.stats[ZOMBIE_TYPE]==ZOMBIE_TYPE_EZ):
                 player.clearBag() #steal players bag
-                teleportHome(screen,player,tilemap,tileset) #send player home
+                teleportHome(screen,player,tilemap) #send player home
             
             #if players hp is 0 after all of this, return game over state
             if(player.stats[STAT_HP]==0):
@@ -734,12 +928,18 @@ def handleZombies(screen,tilemap,tileset,zombies,player,deathSet):
             
             #if the game didn't end, the stat window needs to be updated, so set the return flag (FIXED)
             returnWin = WIN_STAT
+            
+            #the player was teleported, so look up whos touching/near/awake around them again (and start on the newly awake ones)
+            touching=tilemap.getMobsAt(player.pos)
+            nearZombies=set(tilemap.getMobsInRange(player.getPos(),ZOMBIE_AI_RANGE))
+            awakeZombies=tilemap.getMobsInRange(player.getPos(),ZOMBIE_WAKE_RANGE)
+            i=0
         
         #only run the AI and try actions if zombie is within range of its target (e.g player)
-        if (inRange(zombie,zombie.ai.target,ZOMBIE_AI_RANGE)):
+        if (zombie in nearZombies):
             #let the AI kick in to choose a direction,then try and act in that direction
-            nearTiles=tilemap.getNearTiles(zombie.getPos()) #get tiles around zombie
-            newDir=zombie.runAI(nearTiles)#get ai to choose path based on nearby tiles
+            nearTypes=tilemap.getNearTypes(zombie.getPos()) #get types of the tiles around zombie
+            newDir=zombie.runAI(nearTypes)#get ai to choose path based on nearby tiles
             
             #try to act in the direction chosen
             #(will ignore the tile type and always move (cept for blocked tiles!) when doing direction checks if zombie type = extreme. AI handles avoiding blocked tiles)
@@ -747,18 +947,17 @@ def handleZombies(screen,tilemap,tileset,zombies,player,deathSet):
             if(zTryResult):
                 zombie.actTile=zTryResult
                 
-        #update the zombie and get the returned action data
-        zombieAct=zombie.update()
-        
-        #if the zombie is hitting
-        if (zombieAct==ACT_DIG):
-            zHitTile = zombie.actTile #get the tile the zombie is trying to hit
-            zHitResult = zHitTile.hit(zombie.stats[STAT_STR]) #hit it
-            
-            #if the hit returned a result (broke?)
-            if(zHitResult!=None):
-                #set the dug-out tiles attributes and image to "dug" tile
-                zHitTile.change(mines[MINE_DUG],tileset[MINE_DUG])
+        acting.append(zombie)
+    
+    #then animate the zombies that were updated (dying ones stay frozen) and handle whatever they did - all at once in the
+    #...mob store if theres one, otherwise one by one. either way its the same zombies in the same order, so its the same game
+    if (mobStore):
+        zombieActs=mobStore.update(now,[mob.slot for mob in acting])
+    else:
+        zombieActs=[(mob,mob.update(now)) for mob in acting]
+    
+    for (zombie,zombieAct) in zombieActs:
+        handleZombieAct(tilemap,zombie,zombieAct)
                 
     return returnWin
 
@@ -770,39 +969,85 @@ def handleZombies(screen,tilemap,tileset,zombies,player,deathSet):
 #main game loop - handles all game logic and user input events and runs until the user quits or returns to main menu
 # screen (pygame Surface) - the game screen!
 # level - string representing the game level being played (to lookup options in the GAME_LVL's constant)
-def game(screen,level):
-    startTime = pygame.time.get_ticks() #get the time the game started
+# fps (int) - the maximum number of frames to draw per second (0 for no limit)
+# inputSource - where to get input events from - anything with a get() that returns a list of events (pygame.event, ScriptedInput)
+# headless (bool) - if true, nothing is drawn or played, the game ends as soon as its won/lost, and one tick is simulated per loop as fast as possible
+# maxTicks (int) - maximum number of simulation ticks to run before giving up on the game (None for no limit)
+# seed (int) - seed to generate the level from, instead of the levels GAME_OPT_SEED (if both are None, a random one is used)
+#returns - tuple of how the game ended (GAME_RESULT_WIN,GAME_RESULT_LOSE,or GAME_RESULT_TIMEOUT), the simulation time it took (ms),
+#          and the seed the level was generated from
+def game(screen,level,fps=GAME_FPS,inputSource=pygame.event,headless=False,maxTicks=None,seed=None):
     options = GAME_LVLS[level] #get the game options from the level-constants
+    result = GAME_RESULT_TIMEOUT #how the game ended - stays a timeout until its won or lost
 
     #setup and create the player
-    playerImg=loadImage(IMG_PLAYER,TILE_TRANSCOLOR) #load the spriteset image for the player (miner)
-    player = Miner(PLAYER_STARTPOS,SpriteSet(playerImg,SPRITE_SIZE,SPRITE_TEMPLATE),PLAYER_STATS)
-
-    #create the template for the mine map
-    template=randomMapTemplate(options[GAME_OPT_MAP_SIZE],mines,MINE_ROCK) #create random map template of mines
-    template.setBorder(MINE_ROCK) #set the border to be all unbreakable bricks
+    player = Miner(PLAYER_STARTPOS,getSpriteSet(IMG_PLAYER,SPRITE_SIZE,SPRITE_TEMPLATE,TILE_TRANSCOLOR),PLAYER_STATS)
+
+    #get the seed to generate the level from - the one given, or the levels, or a random one (for a new level every game)
+    if (seed is None):
+        seed=options[GAME_OPT_SEED]
+    seedChosen=(seed is not None)
+    if (seed is None):
+        seed=random.getrandbits(32)
+    
+    #the level is generated with its own random number generator, so the same seed always makes the same level.
+    #...anything random during the game itself (e.g. teleporting) gets a separate one, so it never changes how the level is generated.
+    #...the map gets its own seed from the level stream too, so the map tiles and the zombie spawns aren't picked by the same random numbers
+    levelRng=random.Random(seed)
+    mapSeed=levelRng.getrandbits(32)
+    playRng=random.Random(levelRng.getrandbits(32))
+    
     aboveground=mapReader(MAP_FILE,MAP_FILE_DLIM) #load in custom map for aboveground
-    template.setArea((0,0),aboveground) #combine random minemap with aboveground map @ top left corner
+    
+    #levels from a chosen seed are cached (if numpy is around to do it), so each one only ever gets generated once
+    cacheFile=None
+    cachedLevel=None
+    if (numpy and seedChosen):
+        cacheFile=levelCacheFile(level,seed,aboveground)
+        cachedLevel=loadLevelCache(cacheFile)
         
     #load in the tileset and tile maskset for the game 
-    maskSet = ImageSet(IMG_CRACKS,TILE_SIZE,TILE_TRANSCOLOR)
-
-    #create the TileMap for the game and create/add zombies
-    tilemap=TileMap(template,TILESET,TILE_SIZE,player,maskSet)
+    maskSet = getImageSet(IMG_CRACKS,TILE_SIZE,TILE_TRANSCOLOR)
+    
+    #if the level is cached, create the TileMap for the game straight from it, with the zombies where they were
+    if (cachedLevel):
+        (grid,spawns)=cachedLevel
+        tilemap=TileMap(grid,TILESET,TILE_SIZE,player,maskSet,playRng)
+        spawnPositions=iter([(int(x),int(y)) for (x,y) in spawns])
+    
+    #otherwise generate it
+    else:
+        #create the template for the mine map
+        template=randomMapTemplate(options[GAME_OPT_MAP_SIZE],mines,MINE_ROCK,mapSeed) #create random map template of mines
+        template.setBorder(MINE_ROCK) #set the border to be all unbreakable bricks
+        template.setArea((0,0),aboveground) #combine random minemap with aboveground map @ top left corner
+        
+        #create the TileMap for the game and create/add zombies
+        tilemap=TileMap(template,TILESET,TILE_SIZE,player,maskSet,playRng)
+        spawnPositions=None
     
     #create all the zombies for the level (type by type) & add them to the map
     zombies=list()
     for zData in options[GAME_OPT_ZOMBIES]:
-        zombies = zombies + createZombies(zData.copy(),tilemap,TILESET,SPRITE_TEMPLATE,player,(1,len(aboveground))) #copy zombie data (zData) so it doesnt overwrite later plays
-        zombies = zombies + createZombies(zData.copy(),tilemap,TILESET,SPRITE_TEMPLATE,player,(1,len(aboveground))) #copy zombie data (zData) so it doesnt overwrite later plays
+        zombies = zombies + createZombies(zData.copy(),tilemap,SPRITE_TEMPLATE,player,(1,len(aboveground)),levelRng,spawnPositions) #copy zombie data (zData) so it doesnt overwrite later plays
+        zombies = zombies + createZombies(zData.copy(),tilemap,SPRITE_TEMPLATE,player,(1,len(aboveground)),levelRng,spawnPositions) #copy zombie data (zData) so it doesnt overwrite later plays
     tilemap.addMobs(zombies) #add zombies to the tilemap
     
+    #if theres a lot of zombies, update them all at once in a mob store (if numpy is around to do it)
+    mobStore=None
+    if (numpy and len(zombies)>=MOB_STORE_MIN):
+        mobStore=MobStore(zombies)
+    
     #place the winning tile! never allow random placement in the aboveground y-area or before half the y size of the map (whichever comes last!)
-    setWinningTile(options[GAME_OPT_WIN_POS],tilemap,TILESET,(1,max(len(aboveground),tilemap.size[Y]/2)))
+    #...(a cached level already has it). then cache the newly generated level, if its from a chosen seed
+    if (not cachedLevel):
+        setWinningTile(options[GAME_OPT_WIN_POS],tilemap,(1,max(len(aboveground),tilemap.size[Y]/2)),levelRng)
+        
+        if (cacheFile):
+            saveLevelCache(cacheFile,tilemap,zombies)
 
     #setup the fire spriteset for any zombies that need to burn!
-    fireImg=loadImage(IMG_FIRE,TILE_TRANSCOLOR)
-    fireSet=SpriteSet(fireImg,SPRITE_SIZE,FIRE_TEMPLATE)[0][0] #spritesets are dicts, but we only need the first "act"+"dir" of it for this (which is a list)
+    fireSet=getSpriteSet(IMG_FIRE,SPRITE_SIZE,FIRE_TEMPLATE,TILE_TRANSCOLOR)[0][0] #spritesets are dicts, but we only need the first "act"+"dir" of it for this (which is a list)
     
     #setup windows
     shopWin = SHOP_WIN  #setup the shop window
@@ -813,21 +1058,40 @@ def game(screen,level):
     if (not options[GAME_OPT_FOW] and shopWin.getButton(SHOP_BTN_VISION)):
         shopWin.getButton(SHOP_BTN_VISION).disable()
     
-    #intialize a playlist for the game music and start playing the first song (outside song)
-    playlist=[pygame.mixer.Sound(MUSIC_OUTSIDE),pygame.mixer.Sound(MUSIC_MINE)]
-    music=playMusic(None,playlist[0],MUSIC_VOL,MUSIC_FADETIME)
+    #intialize a playlist for the game music and start playing the first song (outside song) - no music when headless
+    music=None
+    if (not headless):
+        playlist=[loadSound(MUSIC_OUTSIDE),loadSound(MUSIC_MINE)]
+        music=playMusic(None,playlist[0],MUSIC_VOL,MUSIC_FADETIME)
     
     #set pygame to "repeat" key-presses (basically key toggling)
     pygame.key.set_repeat(50,50)
     
+    #setup the frame limiter and the simulation clock (the game logic runs in fixed ticks of simulation time, separate from drawing)
+    frameClock=pygame.time.Clock()
+    simClock=SimClock(SIM_TICK,SIM_MAX_TICKS)
+    
+    #setup tracking for what changed on the display each frame, so only that needs updating (see DirtyRects)
+    dirtyRects=DirtyRects()
+    lastShift=None #the map shift when the last frame was drawn
+    lastVisionRect=None #where the players vision circle was when the last frame was drawn
+    lastEndWin=None #the end window when the last frame was drawn
+    
     #play the game for as long as this is true
     play=True
     
     #begin game loop
     while play:
+        #wait out the rest of the frame (if theres a frame limit) and get the time passed since the last one
+        #...when headless, theres no frames to wait on, so just simulate exactly one tick each time around
+        if (headless):
+            elapsed=SIM_TICK
+        else:
+            elapsed=frameClock.tick(fps)
         
         #check all of the events that have occured since last loop
-        for event in pygame.event.get():
+        events=inputSource.get()
+        for event in events:
             #if users quits, exit the game
             if event.type == QUIT:
                 pygame.quit()
@@ -877,98 +1141,152 @@ def game(screen,level):
                         break
                         
                     #update the stat window  
-                    statWin=createStatWin(player)
+                    updateStatWin(statWin,player)
 
-        #always clear screen and redraw tilemap - doesn't matter if game is over or not
-        screen.fill(Color(0,0,0))
-        tilemap.draw(screen)
-        
-        #if the game isn't over yet, run updates for players and zombies and draw any necessary windows/fow
+        #if the game isn't over yet, run the simulation ticks needed to catch up to the time passed
         if (not endWin):
-            #draw the "fog of war" (or lackthereof) if its set as a game option
-            if (options[GAME_OPT_FOW]):
-                #aboveground is in the within the fog of war
-                drawFOW(screen,tilemap,player,[[0 , 0 , len(aboveground[0])*tilemap.tileSize[X] , len(aboveground)*tilemap.tileSize[Y]]])
+            for t in range(simClock.advance(elapsed)):
+                now=simClock.tick() #the simulation time for this tick
                 
-            
-            #HANDLE PLAYER
-            #work horse function for handling the player
-            updateUI=handlePlayer(screen,tilemap,TILESET,player)
-            
-            #if any UI updates need to take place from handling the player, do them.
-            if(updateUI==WIN_STAT):
-                statWin = createStatWin(player)
-            if (updateUI==WIN_END): #if handlePlayer returns WIN_END, you won the game
-                timeElapsed=pygame.time.get_ticks() - startTime #get time elapsed since game started
-                time=humanTime(pygame.time.get_ticks() - startTime) #convert time elapsed to minutes+seconds (human time!)
-                winTitle = "Got the Meth!"
-                if(bestTime(level,timeElapsed)):
-                    winTitle = "New Highscore!"
+                #HANDLE PLAYER
+                #work horse function for handling the player
+                updateUI=handlePlayer(screen,tilemap,player,now)
                 
-                music.stop() #stop any music thats playing
-                playSound(SND_WINNING) #play the winning game sound
-                     
-                endWin=createEndWin(winTitle,"Time : " + time[0] + " minutes, " + time[1] + " seconds")           
-            
-            #HANDLE ZOMBIES
-            #work horse function for handling the zombies
-            updateUI=handleZombies(screen,tilemap,TILESET,zombies,player,fireSet)
-            
-            #if any UI updates need to take place from handling the zombies, do them.
-            if(updateUI==WIN_STAT):
-                statWin = createStatWin(player)
-            elif(updateUI==WIN_END): #if handleZombies returns WIN_END, game over
-                music.stop() #stop any music thats playing
-                playSound(SND_GAMEOVER) #play the game over sound
+                #if any UI updates need to take place from handling the player, do them.
+                if(updateUI==WIN_STAT):
+                    updateStatWin(statWin,player)
+                if (updateUI==WIN_END): #if handlePlayer returns WIN_END, you won the game
+                    result=GAME_RESULT_WIN
+                    timeElapsed=now #simulation time elapsed since game started
+                    time=humanTime(timeElapsed) #convert time elapsed to minutes+seconds (human time!)
+                    winTitle = "Got the Meth!"
+                    if(not headless and bestTime(level,timeElapsed)): #simulated games don't get to post best times
+                        winTitle = "New Highscore!"
+                    
+                    if (music):
+                        music.stop() #stop any music thats playing
+                    playSound(SND_WINNING) #play the winning game sound
+                         
+                    endWin=createEndWin(winTitle,"Time : " + time[0] + " minutes, " + time[1] + " seconds")           
                 
-                #create the end window to display
-                endWin = createEndWin("Game Over","You have died!")
-            
-            
+                #HANDLE ZOMBIES
+                #work horse function for handling the zombies
+                updateUI=handleZombies(screen,tilemap,zombies,player,fireSet,now,mobStore)
+                
+                #if any UI updates need to take place from handling the zombies, do them.
+                if(updateUI==WIN_STAT):
+                    updateStatWin(statWin,player)
+                elif(updateUI==WIN_END): #if handleZombies returns WIN_END, game over
+                    result=GAME_RESULT_LOSE
+                    if (music):
+                        music.stop() #stop any music thats playing
+                    playSound(SND_GAMEOVER) #play the game over sound
+                    
+                    #create the end window to display
+                    endWin = createEndWin("Game Over","You have died!")
+                
+                #stop simulating once the game is over
+                if (endWin):
+                    break
+        
+        #if the game isn't over yet, update the music and the shop
+        if (not endWin):
             #HANDLE MUSIC UPDATING BASED ON PLAYER POS
             #if inside mine, play mine music. otherwise play outside music
-            if(tilemap.getTile(player.getPos()).attributes['type']==MINE_BLOCK_NONE):
-                music=playMusic(music,playlist[1],MUSIC_VOL,MUSIC_FADETIME)
-            else:
-                music=playMusic(music,playlist[0],MUSIC_VOL,MUSIC_FADETIME)
+            if (music):
+                if(tilemap.getType(player.getPos())==MINE_BLOCK_NONE):
+                    music=playMusic(music,playlist[1],MUSIC_VOL,MUSIC_FADETIME)
+                else:
+                    music=playMusic(music,playlist[0],MUSIC_VOL,MUSIC_FADETIME)
             
-            #HANDLE WINDOW DRAWING 
+            #HANDLE SHOP
             #if the player is sitting on a shop tile, show shop!
-            if(tilemap.getTile(player.getPos()).attributes['type']==MINE_SHOP):
+            if(tilemap.getType(player.getPos())==MINE_SHOP):
                 player.addStat(STAT_MONEY,player.clearBag()) #exchange bag for moneys
-                statWin=createStatWin(player) #update the stat window
+                updateStatWin(statWin,player) #update the stat window
                 
                 if(not shopWin.visible):
                     playSound(SND_SHOP) #play the shopping sound !
                     shopWin.visible=True
             else: #otherwise....dont!
                 shopWin.visible=False
+        
+        #headless - nothing to draw, just stop once the game is over or out of time
+        if (headless):
+            if (endWin or (maxTicks and simClock.ticks>=maxTicks)):
+                play=False
+            continue
+        
+        #once the game is over nothing moves anymore, so theres only something new to draw if there was some input
+        if (endWin and endWin is lastEndWin and not events):
+            continue
+        
+        #the whole display needs updating if the map scrolled or the game just ended (or if its not tracking what changed)
+        if (not DIRTY_RECTS or tilemap.shift!=lastShift or endWin is not lastEndWin):
+            dirtyRects.fullUpdate()
+        lastShift=tilemap.shift
+        lastEndWin=endWin
+        
+        #always clear screen and redraw tilemap - doesn't matter if game is over or not
+        screen.fill(Color(0,0,0))
+        dirtyRects.addAll(tilemap.draw(screen))
+        
+        #if the game isn't over yet, draw any necessary windows/fow
+        if (not endWin):
+            #draw the "fog of war" (or lackthereof) if its set as a game option
+            if (options[GAME_OPT_FOW]):
+                #aboveground is in the within the fog of war
+                visionRect=drawFOW(screen,tilemap,player,[[0 , 0 , len(aboveground[0])*tilemap.tileSize[X] , len(aboveground)*tilemap.tileSize[Y]]])
+                
+                #the vision circle moves with the player, even when the map doesn't scroll
+                if (visionRect!=lastVisionRect):
+                    dirtyRects.add(visionRect)
+                    dirtyRects.add(lastVisionRect)
+                    lastVisionRect=visionRect
             
+            #HANDLE WINDOW DRAWING 
             #draw the stat window and shop window...they will only draw if visible
-            statWin.draw(screen)
-            shopWin.draw(screen) 
+            dirtyRects.add(statWin.draw(screen))
+            dirtyRects.add(shopWin.draw(screen))
         
         #if the game is over(endWin is defined), show the end game window
         else:
-            endWin.draw(screen)
+            dirtyRects.add(endWin.draw(screen))
 #WINDOW DRAWING DONE ==========================================================================
 
-        #update the display
-        pygame.display.flip()
+        #update the display - just the parts that changed, if the map didn't scroll
+        dirtyRects.update()
+    
+    return (result,simClock.time,seed)
 
 #creates, displays, and handles events for the main menu for the game, and also controls flow between the menu and the game
 # screen (pygame Surface) - the game screen to draw to
-def menu(screen):
+# seed (int) - seed to generate the levels from (see game), or None
+def menu(screen,seed=None):
     menuWin = MENU_WIN #creates the menu window
     bgImg = loadImage(IMG_MENUBG) #menus background image
+    drawnWin = None #the window thats currently on the display - the menu only gets redrawn when this changes
     
     #keep showing the menu until the user decides to go elsewhere
     while True:
-        for event in pygame.event.get():
+        #draw the background image & menu window, if its changed since it was last drawn
+        if (menuWin is not drawnWin):
+            screen.blit(bgImg,(0,0))
+            menuWin.draw(screen)
+            drawnWin=menuWin
+            
+            pygame.display.flip() #update the display
+        
+        #wait for something to happen (without using any cpu), then handle it along with anything else thats queued up
+        for event in [pygame.event.wait()]+pygame.event.get():
             #if users quits, exit the game
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
+            
+            #if the display needs redrawing (e.g. the window was uncovered), redraw the menu
+            elif event.type == VIDEOEXPOSE:
+                drawnWin=None
                 
             #if the mouse was clicked, check if any buttons were clicked
             elif event.type == MOUSEBUTTONDOWN:
@@ -1008,34 +1326,172 @@ def menu(screen):
                     else:
                         #start game based on which difficulty buttonw as selected
                         if (clicked):
-                            game(screen,clicked) #btn name should has to match up with game difficulty name for this to work
+                            game(screen,clicked,seed=seed) #btn name should has to match up with game difficulty name for this to work
+                            drawnWin=None #the game was drawn over the menu
                         menuWin=MENU_WIN #go back to main menu after game
-                    
-        #draw the background image & menu window
-        screen.blit(bgImg,(0,0))
-        menuWin.draw(screen)
-        
-        pygame.display.flip() #update the display
+
+#draws the loading bar on the splash screen, and updates just that part of the display
+# screen - the screen to draw the bar to
+# loaded (int) - how many things have been loaded so far
+# total (int) - how many things there are to load altogether
+def drawLoadingBar(screen,loaded,total):
+    barRect=Rect(SPLASH_BAR_RECT)
+    fillRect=barRect.inflate(-4,-4)
+    fillRect.width=int(fillRect.width*loaded/float(total)) #force float division
+    
+    pygame.draw.rect(screen,SPLASH_BAR_COLOR,barRect,1) #the bars outline
+    screen.fill(SPLASH_BAR_COLOR,fillRect)
+    pygame.display.update(barRect)
+    
+    pygame.event.pump() #keep the window responsive while loading
 
 #creates and displays a splash screen for a specified amount of time
 # screen - the screen to draw the splash to
 # delay - how long (in milliseconds) to keep up the splash
 def splash(screen,delay):
     startTime=pygame.time.get_ticks()
-    elapsed=pygame.time.get_ticks()
     bgImg = loadImage(IMG_MENUBG) #menus background image
     
-    while(elapsed-startTime<delay):
-        elapsed=pygame.time.get_ticks()
+    screen.blit(bgImg,(0,0))
+    pygame.display.flip() #update the display
+    
+    #load up all the images and sound fx ahead of time, while the splash screen is showing (with a loading bar for how far along it is)
+    total=len(PRELOAD_IMGS)+len(SND_FX)
+    drawLoadingBar(screen,0,total)
+    preloadImages(PRELOAD_IMGS,lambda loaded: drawLoadingBar(screen,loaded,total))
+    loadSounds(SND_FX,lambda loaded: drawLoadingBar(screen,len(PRELOAD_IMGS)+loaded,total))
+    
+    #then wait out whatevers left of the delay (without using any cpu) - still letting the user quit
+    #...any other events (e.g. clicks) are held onto, and put back afterwards for the menu
+    timeLeft=delay-(pygame.time.get_ticks()-startTime)
+    if (timeLeft>0):
+        heldEvents=list()
+        pygame.time.set_timer(SPLASH_EVENT,timeLeft)
+        while True:
+            event=pygame.event.wait()
+            if event.type == QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == SPLASH_EVENT:
+                break
+            heldEvents.append(event)
+        pygame.time.set_timer(SPLASH_EVENT,0) #stop the timer from repeating
         
-        screen.blit(bgImg,(0,0))
+        #put the held events back in the queue, ahead of anything that came in since (in the same order)
+        #...if the queue fills up, the rest get dropped - same as if they'd never been taken out of it
+        try:
+            for event in heldEvents+pygame.event.get():
+                if (event.type != SPLASH_EVENT):
+                    pygame.event.post(event)
+        except pygame.error:
+            pass
+
+#runs a batch of games headless (no display, sound, or person playing) as fast as possible, and prints how each one went
+#...handy for tuning the difficulty of the game levels. the scripted player just wanders around digging at random
+# level (str) - the game level to simulate (to lookup options in the GAME_LVL's constant)
+# numGames (int) - the number of games to simulate
+# maxTicks (int) - the maximum number of ticks to simulate each game for before calling it a timeout
+# seed (int) - seed for the first games level (the rest get seed+1, seed+2, etc), or None for random levels
+#returns - list of the results from each game (see game())
+def simulate(level,numGames,maxTicks,seed=None):
+    screen = pygame.display.set_mode(SCREEN_SIZE,0,DUMMY_DEPTH) #dummy screen - never actually drawn to
+    convertDisplay()
+    setSoundEnabled(False)
+    
+    results=list()
+    startTime=pygame.time.get_ticks()
+    for g in range(0,numGames):
+        #each game gets its own scripted player, seeded by the game number so runs are repeatable
+        #...and if theres a seed, each game gets its own level from it too (seed, seed+1, etc)
+        scriptedInput=ScriptedInput(HEADLESS_KEYS,HEADLESS_KEY_INTERVAL,random.Random(g))
+        result=game(screen,level,0,scriptedInput,True,maxTicks,None if seed is None else seed+g)
+        results.append(result)
+        
+        time=humanTime(result[1])
+        print level + " game " + str(g+1) + " (seed " + str(result[2]) + ") : " + result[0] + " after " + time[0] + " minutes, " + time[1] + " seconds"
+    
+    print str(numGames) + " games simulated in " + str((pygame.time.get_ticks()-startTime)/1000.0) + " seconds"
+    return results
+
+#times drawing the tilemap on maps of each of the benchmark sizes (BENCH_MAP_SIZES), and prints how long each frame took
+#...the map is scrolled to its middle, with the player there and as many zombies per tile as the easy level, so the time per frame
+#...should stay about the same no matter how big the map is
+# numFrames (int) - the number of frames to draw on each map
+#returns - dict of the average time per frame on each map (map size:ms)
+def benchmark(numFrames):
+    screen = pygame.display.set_mode(SCREEN_SIZE,0,DUMMY_DEPTH) #dummy screen - drawn to, but never shown
+    convertDisplay()
+    
+    options=GAME_LVLS[GAME_LVL_EZ]
+    aboveground=mapReader(MAP_FILE,MAP_FILE_DLIM)
+    maskSet=getImageSet(IMG_CRACKS,TILE_SIZE,TILE_TRANSCOLOR)
+    
+    frameTimes=dict()
+    for mapSize in BENCH_MAP_SIZES:
+        #generate the map the same way a game does (from a fixed seed, so its the same map every run)
+        #...the map, the tilemap and the zombies each get their own seed from it, like in a game
+        benchRng=random.Random(BENCH_SEED)
+        template=randomMapTemplate((mapSize,mapSize),mines,MINE_ROCK,benchRng.getrandbits(32))
+        template.setBorder(MINE_ROCK)
+        template.setArea((0,0),aboveground)
+        
+        #put the player in the middle of the map, and scroll the map to it
+        player=Miner((mapSize/2,mapSize/2),getSpriteSet(IMG_PLAYER,SPRITE_SIZE,SPRITE_TEMPLATE,TILE_TRANSCOLOR),PLAYER_STATS)
+        tilemap=TileMap(template,TILESET,TILE_SIZE,player,maskSet,random.Random(benchRng.getrandbits(32)))
+        tilemap.setTile((mapSize/2,mapSize/2),MINE_DUG)
+        scrollMap(screen,player,tilemap)
+        
+        #scale the easy levels zombies up to the map size, so theres about as many on the screen on every map
+        levelRng=random.Random(benchRng.getrandbits(32))
+        zombies=list()
+        for zData in options[GAME_OPT_ZOMBIES]:
+            zData=zData.copy()
+            zData[GAME_OPT_ZOMBIE_NUM]=zData[GAME_OPT_ZOMBIE_NUM]*mapSize*mapSize/(options[GAME_OPT_MAP_SIZE][X]*options[GAME_OPT_MAP_SIZE][Y])
+            zombies = zombies + createZombies(zData,tilemap,SPRITE_TEMPLATE,player,(1,len(aboveground)),levelRng)
+        tilemap.addMobs(zombies)
         
-        pygame.display.flip() #update the display
+        #draw once first so the visible chunks are already rendered, then time the rest
+        tilemap.draw(screen)
+        startTime=time.time()
+        for frame in range(0,numFrames):
+            tilemap.draw(screen)
+        frameTimes[mapSize]=(time.time()-startTime)*1000.0/numFrames
+        
+        print str(mapSize) + "x" + str(mapSize) + " map (" + str(len(zombies)) + " zombies) : " + ("%.3f" % frameTimes[mapSize]) + " ms per frame"
+    
+    return frameTimes
+
+#reads the command line arguments
+#returns - the parsed arguments (argparse Namespace)
+def parseArgs():
+    parser=argparse.ArgumentParser(description="A Simple mining game in which the player must collect mines and avoid zombies.")
+    parser.add_argument("--headless",action="store_true",help="simulate games with no display or sound instead of playing")
+    parser.add_argument("--level",default=GAME_LVL_EZ,choices=GAME_LVLS.keys(),help="level to simulate when headless")
+    parser.add_argument("--games",type=int,default=HEADLESS_GAMES,help="number of games to simulate when headless")
+    parser.add_argument("--ticks",type=int,default=HEADLESS_MAX_TICKS,help="maximum ticks to simulate each game for when headless")
+    parser.add_argument("--seed",type=int,default=None,help="seed to generate levels from - the same seed always makes the same level")
+    parser.add_argument("--bench",action="store_true",help="time drawing the map on small and huge maps instead of playing")
+    parser.add_argument("--frames",type=int,default=BENCH_FRAMES,help="number of frames to draw on each map when benchmarking")
+    
+    return parser.parse_args()
 
 # main program - sets up the display & start the game menu to control the rest of the action here-on-in
 def main():
+    args=parseArgs()
+    
+    #if we're running headless, simulate the games and be done with it
+    if (args.headless):
+        simulate(args.level,args.games,args.ticks,args.seed)
+        return
+    
+    #same for benchmarking
+    if (args.bench):
+        benchmark(args.frames)
+        return
+    
     #setup game screen
     gameScreen = pygame.display.set_mode(SCREEN_SIZE,pygame.FULLSCREEN)
+    convertDisplay() #convert all the images to the displays format now that its set
     
     #continue to loop through the menu & game until the program is exited
     while True:
@@ -1043,7 +1499,7 @@ def main():
         splash(gameScreen,SPLASH_DELAY)
         
         #start the menu, which in turn will start any games or otherwise
-        menu(gameScreen)
+        menu(gameScreen,args.seed)
 
 #Start the program
 if __name__ == "__main__":
@@ -44,10 +44,34 @@ FLIPVAL="^"
 FOV_OFFSET=(15,15) #offset to center the FOV on the character
 DATA_DIR = "data/"
 SPLASH_DELAY=4000 #4 second delay on splash screen
+SPLASH_EVENT=USEREVENT #event posted when the splash screens delay is up
+SPLASH_BAR_RECT=(50,460,400,12) #position and size of the loading bar on the splash screen
+SPLASH_BAR_COLOR=Color(90,70,55) #color of the loading bar on the splash screen
+GAME_FPS=60 #maximum number of frames drawn per second in game (0 to draw as fast as possible)
+SIM_TICK=10 #length of a single simulation tick (ms) - the game logic always steps ahead by this much, whatever the frame rate
+SIM_MAX_TICKS=10 #maximum number of simulation ticks to run for a single frame
+DIRTY_RECTS=True #only update the areas of the display that changed each frame, instead of the whole display (its all updated whenever the map scrolls)
+
+#game results - how a game ended
+GAME_RESULT_WIN="won"
+GAME_RESULT_LOSE="died"
+GAME_RESULT_TIMEOUT="timed out" #only happens when a game has a tick limit (headless)
+
+#headless simulation constants
+HEADLESS_KEYS=[K_DOWN,K_DOWN,K_DOWN,K_LEFT,K_RIGHT,K_RIGHT,K_UP] #keys the scripted player picks from at random (weighted towards digging down)
+HEADLESS_KEY_INTERVAL=10 #number of ticks between scripted key presses
+HEADLESS_MAX_TICKS=360000 #give up on a simulated game after this many ticks (an hour of game time)
+HEADLESS_GAMES=10 #default number of games to simulate
+DUMMY_DEPTH=32 #bit depth to ask SDL's dummy display for (SDL1 defaults it to 8 bit, which cant hold images with per-pixel alpha)
+BENCH_MAP_SIZES=(40,200,1000) #map sizes (tiles per side) to time drawing on in benchmark mode - should take about as long on all of them
+BENCH_FRAMES=300 #default number of frames to draw on each map in benchmark mode
+BENCH_SEED=0 #seed to generate the benchmark maps from, so every run times the same maps
 
 #constants for the best-times file (high scores)
 TIME_FILE=DATA_DIR + "times.dat"
 TIME_DLIM="="
+LEVEL_CACHE_DIR=DATA_DIR + "cache/" #where generated levels are cached (only levels from a chosen seed - see GAME_OPT_SEED)
+LEVEL_CACHE_VERSION=4 #change whenever the way levels are generated changes, so levels cached the old way get ignored
 
 #tile constants
 TILE_TRANSCOLOR = Color(255,0,255,0)
@@ -76,6 +100,9 @@ SND_VOL_QUIET=0.5
 MUSIC_VOL=0.2
 MUSIC_FADETIME=3000
 MUSIC_FADEIN_FACTOR=3
+SND_FX=[SND_HIT,SND_BREAK,SND_MINE,SND_SHOP,SND_ZOMBIE,SND_GAMEOVER,SND_WINNING] #all the sound fx - preloaded into the sound bank
+SND_CHANNELS=8 #number of mixer channels - sound fx are skipped if they're all busy
+SND_MIN_DELAY=60 #minimum time (ms) between plays of the same sound fx - any faster and they're skipped instead of piling up
 
 #image file locations
 IMG_DIR = 'images/'
@@ -87,9 +114,13 @@ IMG_PLAYER=IMG_DIR+'player.png'
 IMG_CRACKS=IMG_DIR+'cracks.png'
 IMG_TILESET=IMG_DIR+'mines.png'
 IMG_FIRE=IMG_DIR+'fire.png'
-IMG_BTNSET=IMG_DIR+'buttonset.png'
-IMG_WINSET=IMG_DIR+'winset.png'
+IMG_BTNSET=IMG_DIR+'buttonSet.png'
+IMG_WINSET=IMG_DIR+'winSet.png'
 IMG_MENUBG=IMG_DIR+"menu.png"
+#all the images (and their transparent colors) the game needs - preloaded during the splash screen
+PRELOAD_IMGS=[(IMG_MENUBG,None),(IMG_WINSET,TILE_TRANSCOLOR),(IMG_BTNSET,TILE_TRANSCOLOR),(IMG_TILESET,TILE_TRANSCOLOR),
+              (IMG_CRACKS,TILE_TRANSCOLOR),(IMG_FIRE,TILE_TRANSCOLOR),(IMG_PLAYER,TILE_TRANSCOLOR),(IMG_ZOMBIE_EZ,TILE_TRANSCOLOR),
+              (IMG_ZOMBIE_MED,TILE_TRANSCOLOR),(IMG_ZOMBIE_HARD,TILE_TRANSCOLOR),(IMG_ZOMBIE_EXTREME,TILE_TRANSCOLOR)]
 
 #spriteset template (RL) for both player and zombiea
 SPRITE_SIZE = TILE_SIZE #currently, changing this might mess things up
@@ -134,6 +165,9 @@ AI_CHECKORDER = {DIR_UP:    [DIR_UP,DIR_RIGHT,DIR_LEFT,DIR_DOWN],
                  DIR_DOWN:  [DIR_DOWN,DIR_RIGHT,DIR_LEFT,DIR_UP]}
 
 ZOMBIE_AI_RANGE = 10 #only initialize AI if zombie is within this range of tiles from its target
+ZOMBIE_WAKE_RANGE = ZOMBIE_AI_RANGE*2 #zombies further than this from the player are left sleeping (not updated at all)
+ZOMBIE_MID_TICKS = 4 #zombies between the AI and wake ranges only update once every this many simulation ticks
+MOB_STORE_MIN = 100 #with at least this many zombies (and numpy installed), zombies are updated all at once in a MobStore
 
 #zombie constants for types of zombies and zombie-specific stats
 ZOMBIE_TYPE="zType" #mob stat for the type of mob
@@ -159,6 +193,9 @@ ZOMBIE_EXTREME= {ZOMBIE_IMG: IMG_ZOMBIE_EXTREME,
 MAP_FILE = DATA_DIR + "above.dat" #name of the aboveground map file
 MAP_FILE_DLIM='\t' #file delimiter for aboveground map file
 MAP_OVERSCROLL=(TILE_SIZE[X]/len(SPRITE_TEMPLATE[1][0]),TILE_SIZE[Y]/len(SPRITE_TEMPLATE[1][0])) #overscroll safety net to help with map edge clipping - basically the "stepping" distance when the player walks
+MOB_CELL_SIZE=4 #size (in tiles) of each cell in the tilemaps mob lookup grid
+MAP_CHUNK_SIZE=16 #size (in tiles) of each pre-rendered chunk of the tilemap
+MAP_CHUNK_CACHE=16 #maximum number of pre-rendered chunks kept around at once (least recently drawn get thrown out first)
 
 #game level constants/option flags for various game levels/difficulties
 GAME_LVL_FREE="Free Play"
@@ -171,6 +208,7 @@ GAME_OPT_ZOMBIES="z" #game option to hold list of zombies (stats, etc)
 GAME_OPT_ZOMBIE_NUM="zNum" #game option for the number of zombies
 GAME_OPT_MAP_SIZE="mapSize" #game option for size of the map
 GAME_OPT_WIN_POS="winPos" #game option for winning position on a map
+GAME_OPT_SEED="seed" #game option for the seed to generate the level from - the same seed always makes the same level (None for a new level every game)
 WIN_POS_RAND='?' #flag for a random winning position, within the bounds of the map
 
 
@@ -179,11 +217,13 @@ GAME_LVLS = {
                 GAME_LVL_FREE  :{GAME_OPT_MAP_SIZE:(40,40),
                                  GAME_OPT_WIN_POS :(38,38), #last row, last col
                                  GAME_OPT_FOW     :False, #no fow
+                                 GAME_OPT_SEED    :None, #new level every game
                                  GAME_OPT_ZOMBIES :[]}, #no zombies
                 #easy level options
                 GAME_LVL_EZ    :{GAME_OPT_MAP_SIZE:(40,40),
                                  GAME_OPT_WIN_POS :(WIN_POS_RAND,38), #alst row, last col
                                  GAME_OPT_FOW     :False, #no fow
+                                 GAME_OPT_SEED    :None, #new level every game
                                  GAME_OPT_ZOMBIES :[ #10 ez zombies
                                                      dict(ZOMBIE_EZ.items() +  [(GAME_OPT_ZOMBIE_NUM,10)])
                                                    ]},
@@ -191,6 +231,7 @@ GAME_LVLS = {
                 GAME_LVL_MED  :{GAME_OPT_MAP_SIZE:(50,50),
                                 GAME_OPT_WIN_POS :(WIN_POS_RAND,48), #winning tile position (random, but on the last row!)
                                 GAME_OPT_FOW     :True,  #fow
+                                GAME_OPT_SEED    :None, #new level every game
                                 GAME_OPT_ZOMBIES :[ #10 ez, and 10 medium zombies
                                                      dict(ZOMBIE_EZ.items() +  [(GAME_OPT_ZOMBIE_NUM,10)]),
                                                      dict(ZOMBIE_MED.items() + [(GAME_OPT_ZOMBIE_NUM,10)])
@@ -199,6 +240,7 @@ GAME_LVLS = {
                 GAME_LVL_HARD   :{GAME_OPT_MAP_SIZE:(60,60),
                                   GAME_OPT_WIN_POS :(WIN_POS_RAND,WIN_POS_RAND), #winning tile position (random, but on the last row!)
                                   GAME_OPT_FOW     :True,  #fow
+                                  GAME_OPT_SEED    :None, #new level every game
                                   GAME_OPT_ZOMBIES :[ #10 ez, 10 medium, and 5 hard zombies
                                                      dict(ZOMBIE_EZ.items() +  [(GAME_OPT_ZOMBIE_NUM,10)]),
                                                      dict(ZOMBIE_MED.items() + [(GAME_OPT_ZOMBIE_NUM,10)]),
@@ -208,6 +250,7 @@ GAME_LVLS = {
                 GAME_LVL_EXTREME:{GAME_OPT_MAP_SIZE:(70,70),
                                   GAME_OPT_WIN_POS :(WIN_POS_RAND,WIN_POS_RAND), #winning tile position (random, but on the last row!)
                                   GAME_OPT_FOW     :True,  #fow
+                                  GAME_OPT_SEED    :None, #new level every game
                                   GAME_OPT_ZOMBIES :[ #15 ez, 10 medium, and 5 hard zombies
                                                      dict(ZOMBIE_EZ.items() +  [(GAME_OPT_ZOMBIE_NUM,10)]),
                                                      dict(ZOMBIE_MED.items() + [(GAME_OPT_ZOMBIE_NUM,10)]),
@@ -280,6 +323,17 @@ mines={ #diggable tiles - first is blank, last is win, others are minable
         27:         {ATTR_NAME:"Shop6",         ATTR_CHANCE:0,   ATTR_VAL:0,           ATTR_TYPE:MINE_SHOP},               
       }
 
+#shared mine attribute tables, indexed by mine id - used by the tilemap instead of giving each tile its own copy of the attributes
+MINE_TYPES=[mines[m][ATTR_TYPE] for m in range(0,len(mines))]
+MINE_VALS=[mines[m][ATTR_VAL] for m in range(0,len(mines))]
+MINE_HITS=[mines[m].get(ATTR_HITS,0) for m in range(0,len(mines))] #0 for mines that can't be hit
+
+#pathfinding (flow field) constants
+FLOW_RANGE=ZOMBIE_AI_RANGE*2 #how far (in tiles, each way) from the target a flow field reaches - a bit past the AI range so mobs can path around things
+FLOW_WALK_COST=1 #cost of stepping onto any tile
+FLOW_DIG_COST=1 #additional cost of stepping onto a tile for each hp it has left (has to be dug through first)
+FLOW_BLOCKED=[MINE_BLOCK_FULL,MINE_BLOCK_UP] #types of tiles mobs will never path through (blocked, or outside where they would die)
+
 
 #------------------------------------------------------------------------------------------------------
 #UI CONSTANTS
@@ -321,6 +375,7 @@ WIN_FONT = pygame.font.Font(WIN_FONT_FILE,WIN_FONT_SIZE) #general font (mainly i
 WIN_SHOP_FONT = pygame.font.Font(WIN_GAME_FONT_FILE,WIN_SHOP_FONT_SIZE)
 WIN_STAT_FONT = pygame.font.Font(WIN_GAME_FONT_FILE,WIN_FONT_STAT_SIZE); WIN_STAT_FONT.set_bold(True) #bold the stat font
 BTN_FONT = pygame.font.Font(WIN_BTN_FONT_FILE,WIN_FONT_BTN_SIZE)
+TEXT_CACHE_SIZE = 256 #maximum number of rendered text images kept around at once (least recently used get thrown out first)
 
 #size of the panels for the windowset and button set images
 WINSET_PNLSIZE=(438,25)
@@ -8,8 +8,16 @@
 # Aug 16,2013
 #   - all revision history in ZombieMiner2.py
 
-import pygame
+import pygame,hashlib,os
 from pygame.locals import *
+from collections import OrderedDict
+
+#numpy is optional - its only used to speed up changing images pixel-by-pixel (see tintImage), which falls back to plain python without it
+try:
+    import numpy
+    import pygame.surfarray
+except ImportError:
+    numpy=None
 
 from gameConstants import *
 
@@ -17,31 +25,153 @@ from gameConstants import *
 pygame.init()
 
 #dirty fix to allow loading of images error-free before main display kicks in
-pygame.display.set_mode((1,1), pygame.NOFRAME)
+#...SDL1's dummy display (headless/benchmark modes) is 8 bit unless told otherwise, so give it a depth that per-pixel alpha works at
+if (os.environ.get("SDL_VIDEODRIVER")=="dummy"):
+    pygame.display.set_mode((1,1), pygame.NOFRAME, DUMMY_DEPTH)
+else:
+    pygame.display.set_mode((1,1), pygame.NOFRAME)
+
+#flag for whether or not sound fx get played (turned off when running headless)
+soundEnabled=True
+
+#the image cache - every image loaded so far ((image file,transparent color):Surface), and how long each took to load (ms)
+images=dict()
+imageLoadTimes=dict()
+
+#the pixel format of the display the images were last converted to (see convertImages) - None until the display is ready
+displayFormat=None
+
+#the text cache - rendered text images ((text,font,color,lineDlim,lineCenter):Surface), least recently used first
+#...and how many times text was found in the cache (hits) or had to be rendered (misses)
+textCache=OrderedDict()
+textCacheHits=0
+textCacheMisses=0
+
+#the sound bank - every sound loaded so far (sound file:Sound), and when each sound fx was last played (sound file:ticks)
+sounds=dict()
+soundPlayed=dict()
+
+#turns sound fx on or off
+#enabled (bool) - true to play sounds, false to silence them
+def setSoundEnabled(enabled):
+    global soundEnabled
+    soundEnabled=enabled
 
 #Generic load image function - loads an image from a file and sets its colorkey if given
+#...each image is only ever loaded once - after that its taken from the image cache
 #imgFile (str) - the filename for the image
 #transColor (color) - the color wished to be transparent
-#returns - the image (pygame Surface)
+#returns - the image (pygame Surface) - its shared, so copy it before modifying it!
 def loadImage(imgFile,transColor=None):
-    #load image from file
-    img = pygame.image.load(imgFile)
+    key=(imgFile,tuple(transColor) if transColor else None)
     
-    #if there is a transparency color set, set the colorkey so that color is transparent
-    if(transColor):
-        #img=img.convert() #transparency fix for some images - converts it so it doesnt have a per-pixel alpha. not currently used
-        img.set_colorkey(transColor, RLEACCEL)
+    if (key not in images):
+        startTime=pygame.time.get_ticks()
+        
+        #load image from file
+        img = pygame.image.load(imgFile)
+        
+        #if there is a transparency color set, set the colorkey so that color is transparent
+        if(transColor):
+            img.set_colorkey(transColor, RLEACCEL)
+        
+        #if the display is ready, convert the image to its format right away
+        if(displayFormat):
+            img=convertImage(img)
+        
+        images[key]=img
+        imageLoadTimes[key]=pygame.time.get_ticks()-startTime
     
-    return img
+    return images[key]
+
+#converts an image to the displays pixel format, so it doesn't have to be converted every time its drawn
+#...keeps per-pixel alpha if the image has it, otherwise keeps its colorkey (transparent color)
+#img (pygame Surface) - the image to convert
+#returns - the converted image (a new Surface)
+def convertImage(img):
+    if(img.get_flags() & SRCALPHA):
+        return img.convert_alpha()
+    
+    newImg=img.convert()
+    if(img.get_colorkey()):
+        newImg.set_colorkey(img.get_colorkey(),RLEACCEL)
+    return newImg
+
+#converts every image in the image cache to the pixel format of the display - needs to be called whenever the display mode is set,
+#...as images loaded before then (or with a different display) blit a lot slower. new images are converted as they're loaded after this
+#returns - true if the images were converted, false if they already match the displays format
+def convertImages():
+    global displayFormat
+    
+    screen=pygame.display.get_surface()
+    newFormat=(screen.get_bitsize(),screen.get_masks())
+    if(newFormat==displayFormat):
+        return False
+    
+    displayFormat=newFormat
+    for key in images.keys():
+        images[key]=convertImage(images[key])
+    
+    textCache.clear() #cached text is in the old format - it'll get re-rendered as its needed
+    
+    return True
+
+#preloads images into the image cache, so nothing has to be loaded later on. prints how long each one took to load
+# imgs (list) - (image file,transparent color) for each image to load
+# progress (function) - called with the number of images loaded so far after each one loads, if given (e.g. for a loading bar)
+#returns - the total time it took to load the images (ms)
+def preloadImages(imgs,progress=None):
+    totalTime=0
+    for loaded,(imgFile,transColor) in enumerate(imgs):
+        loadImage(imgFile,transColor)
+        
+        loadTime=imageLoadTimes[(imgFile,tuple(transColor) if transColor else None)]
+        totalTime+=loadTime
+        print "loaded " + imgFile + " in " + str(loadTime) + "ms"
+        
+        if (progress):
+            progress(loaded+1)
+    
+    print "loaded " + str(len(imgs)) + " images in " + str(totalTime) + "ms"
+    return totalTime
 
 #Creates an image from text - handles multi-line text since pygame doesnt natively support it
+#...the same text (with the same font, color, etc) is only rendered once, then taken from the text cache
 #text (str) - text to convert to an image
 #font (pygame Font) - Font to be used in the image
 #color (Color) - color of text
 #lineDlim (str) - line delimiter for the text if its multi-line
 #lineCenter (bool) - flag to determine whether or not to center multi-line text
-#returns - the text as an image (pygame Surface)
+#returns - the text as an image (pygame Surface) - its shared, so copy it before modifying it!
 def textImage(text,font,color,lineDlim=None,lineCenter=False):
+    global textCacheHits,textCacheMisses
+    
+    key=(text,font,tuple(color),lineDlim,lineCenter)
+    
+    #if its been rendered already, move it to the back of the line (most recently used) and use it
+    if(key in textCache):
+        textCacheHits+=1
+        txtImg=textCache.pop(key)
+        textCache[key]=txtImg
+        return txtImg
+    
+    #otherwise render it, and throw out the least recently used text if the cache is full
+    textCacheMisses+=1
+    txtImg=renderText(text,font,color,lineDlim,lineCenter)
+    textCache[key]=txtImg
+    if(len(textCache)>TEXT_CACHE_SIZE):
+        textCache.popitem(False)
+    
+    return txtImg
+
+#Renders an image from text (see textImage)
+#text (str) - text to convert to an image
+#font (pygame Font) - Font to be used in the image
+#color (Color) - color of text
+#lineDlim (str) - line delimiter for the text if its multi-line
+#lineCenter (bool) - flag to determine whether or not to center multi-line text
+#returns - the text as an image (pygame Surface)
+def renderText(text,font,color,lineDlim=None,lineCenter=False):
     if(lineDlim): #if there is a line delimter...
         lines = str(text).split(lineDlim) # split up the line
         imgWid=0 #the final images width
@@ -50,8 +180,8 @@ def textImage(text,font,color,lineDlim=None,lineCenter=False):
             lineImgs.append(font.render(line, 1, color)) #render its image (using bit transparency) and add it to the img list
             
             #determine if this line is the largest so far, if so, store its size 
-            if font.size(line)[X] > imgWid:
-                imgWid=font.size(line)[X]
+            if lineImgs[-1].get_width() > imgWid:
+                imgWid=lineImgs[-1].get_width()
         
         #create a surface to hold the master image, fill the surface and set its colorkey to the transparent color
         txtImg=pygame.Surface((imgWid,len(lines)*font.get_linesize()),pygame.SRCALPHA)
@@ -66,6 +196,10 @@ def textImage(text,font,color,lineDlim=None,lineCenter=False):
     else: #otherwise, if its not a multi-liner...
         #render it with bit transparency
         txtImg=font.render(text, 1, color)
+    
+    #if the display is ready, convert the text image to its format
+    if(displayFormat):
+        txtImg=convertImage(txtImg)
         
     return txtImg
 
@@ -91,25 +225,57 @@ def specialPos(pos,bigSize,smallSize):
         
     return newPos;
 
-#Generic pixel-by-pixel RGB brightener (or shader) for a Surface
+#Generic RGB tinter for a Surface - multiplies each pixels r,g and b values by a factor (leaving any colorkeyed pixels alone)
+#uses numpy to change all the pixels at once if its available and the image is 24/32 bit, otherwise goes pixel by pixel
+#img (Surface) - the image to tint
+#tint (tuple) - factors (0.1=10%,2=200%) to modify the r,g and b values by
+#returns - N/A, modifies img directly
+def tintImage(img,tint):
+    colorkey=img.get_colorkey()
+    
+    if (numpy and img.get_bytesize()>=3):
+        pixels=pygame.surfarray.pixels3d(img) #references the images pixels directly (locks the image until its deleted)
+        tinted=numpy.clip(pixels*numpy.array(tint,dtype=float),MIN_RGB,MAX_RGB).astype(numpy.uint8)
+        
+        #put back any pixels that are the transparent color
+        if (colorkey):
+            keyed=numpy.all(pixels==colorkey[:3],axis=2)
+            tinted[keyed]=pixels[keyed]
+        
+        pixels[...]=tinted
+        del pixels #unlock the image
+    
+    else:
+        for y in range(img.get_height()):
+            for x in range(img.get_width()):
+                pixel = img.get_at((x,y))
+                if (pixel!=colorkey):
+                    rgb=[int(tint[0] * pixel.r),int(tint[1] * pixel.g),int(tint[2] * pixel.b)]
+                    
+                    #make sure chosen rgb values are valid
+                    for clr in range(0,len(rgb)):
+                        if rgb[clr] > MAX_RGB:
+                            rgb[clr]=MAX_RGB
+                        elif rgb[clr]<MIN_RGB:
+                            rgb[clr]=MIN_RGB
+                    
+                    img.set_at((x,y),(rgb[0],rgb[1],rgb[2],pixel.a)) #keep the pixels alpha, like the numpy path does
+
+#tints a copy of an image, leaving the original alone - for images shared between things (tilesets, spritesets, etc)
+#img (Surface) - the image to tint a copy of
+#tint (tuple) - factors (0.1=10%,2=200%) to modify the r,g and b values by
+#returns - the tinted copy (Surface)
+def tintedImage(img,tint):
+    newImg=img.copy()
+    tintImage(newImg,tint)
+    return newImg
+
+#Generic RGB brightener (or shader) for a Surface - tints all of r,g and b by the same factor
 #img (Surface) - the image to change the rgb values of
 #factor (float) - factor (0.1=10%,2=200%) to modify the rgb by
 #returns - N/A, modifies img directly
 def changeBrightness(img,factor):
-    for y in range(img.get_height()):
-        for x in range(img.get_width()):
-            pixel = img.get_at((x,y))
-            if (pixel!=img.get_colorkey()):
-                rgb=[int(factor * pixel.r),int(factor * pixel.g),int(factor * pixel.b)]
-                
-                #make sure chosen rgb values are valid
-                for clr in range(0,len(rgb)):
-                    if rgb[clr] > MAX_RGB:
-                        rgb[clr]=MAX_RGB
-                    elif rgb[clr]<MIN_RGB:
-                        rgb[clr]=MIN_RGB
-                
-                img.set_at((x,y),(rgb[0],rgb[1],rgb[2]))
+    tintImage(img,(factor,factor,factor))
 
 #Given a time in seconds, converts it into minutes and seconds
 #time (int) - time in seconds
@@ -120,6 +286,21 @@ def humanTime(time):
     
     return (minutes,seconds)
 
+#gets a hash of some data (dicts, lists, tuples, numbers, strings...) that is always the same for the same data,
+#...whatever order the dicts happen to be in. handy for telling when something saved to a file is out of date
+#data - the data to hash
+#returns - the hash (hex str)
+def dataHash(data):
+    #turns the data into a string, with the dicts in key order
+    def dataStr(data):
+        if (isinstance(data,dict)):
+            return "{" + ",".join(dataStr(key) + ":" + dataStr(data[key]) for key in sorted(data.keys())) + "}"
+        if (isinstance(data,(list,tuple))):
+            return "[" + ",".join(dataStr(item) for item in data) + "]"
+        return repr(data)
+    
+    return hashlib.md5(dataStr(data)).hexdigest()
+
 #loads/plays/swaps (with fading) different music files for the game
 # oldMusic (Sound) - the music currently playing
 # musicFile (str) - the new music file to load
@@ -141,14 +322,55 @@ def playMusic(oldMusic,newMusic,vol,fadeTime):
     newMusic.set_volume(vol)
     return newMusic
     
+#gets a sound from the sound bank, loading it from its file the first time its needed
+# sndFile (str) - the sound file
+#returns - the sound
+def loadSound(sndFile):
+    if (sndFile not in sounds):
+        sounds[sndFile]=pygame.mixer.Sound(sndFile)
+    
+    return sounds[sndFile]
+
+#preloads sounds into the sound bank and sets up the mixers channels for them, so nothing has to be loaded during the game
+# sndFiles (list) - the sound files to load
+# progress (function) - called with the number of sounds loaded so far after each one loads, if given (e.g. for a loading bar)
+#returns - the time it took to load the sounds (ms)
+def loadSounds(sndFiles,progress=None):
+    startTime=pygame.time.get_ticks()
+    
+    pygame.mixer.set_num_channels(SND_CHANNELS)
+    for loaded,sndFile in enumerate(sndFiles):
+        loadSound(sndFile)
+        
+        if (progress):
+            progress(loaded+1)
+    
+    loadTime=pygame.time.get_ticks()-startTime
+    print "loaded " + str(len(sndFiles)) + " sounds in " + str(loadTime) + "ms"
+    return loadTime
+
 #plays a sound a single time and returns it. for sound fx
-# sndFile (str) - the sound file to load and play
+#...skipped if the same sound was played less than SND_MIN_DELAY ago or there are no free channels, so sounds dont pile up
+# sndFile (str) - the sound file to play
 # volume (float) - the volume to play the sound at
-#returns - the sound
+#returns - the sound, or None if sounds are turned off or it was skipped
 def playSound(sndFile,volume=SND_VOL_LOUD):
-    snd=pygame.mixer.Sound(sndFile)
-    snd.set_volume(volume)
-    snd.play()
+    if (not soundEnabled):
+        return None
+    
+    #dont play the same sound again too soon
+    now=pygame.time.get_ticks()
+    if (sndFile in soundPlayed and now-soundPlayed[sndFile]<SND_MIN_DELAY):
+        return None
+    
+    #find a free channel to play it on (the sound itself is shared, so the volume is set on the channel)
+    channel=pygame.mixer.find_channel()
+    if (not channel):
+        return None
+    
+    snd=loadSound(sndFile)
+    channel.set_volume(volume)
+    channel.play(snd)
+    soundPlayed[sndFile]=now
     
     return snd
-    
\ No newline at end of file
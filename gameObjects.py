@@ -35,100 +35,132 @@
 
 import pygame,math,random,re
 from pygame.locals import *
+from collections import OrderedDict
+from heapq import heappush,heappop
+from array import array
 
 from gameConstants import *
 from gameFunctions import *
 
+#numpy is optional - its only used to update big groups of mobs all at once (see MobStore)
+try:
+    import numpy
+except ImportError:
+    numpy=None
+
 
 #A Generic Drawable object
 #pos (tuple) - the absolute position of the drawable on the screen
 #img (pygame Surface) - the image to draw for the drawable
 #maskSet (list) - the image set for a mask
+#copyImg (bool) - whether to make the drawable its own copy of the image (set false if the image is shared and never modified)
 class Drawable(object):
     #initializes the drawable. hskpg
-    def __init__(self, pos=(0,0),img=None,maskSet=None):
+    def __init__(self, pos=(0,0),img=None,maskSet=None,copyImg=True):
         self.pos = pos
         
         if(img):
             #create a copy, so it can be modified if necessary and not affect other drawables using the same image
-            self.img = img.copy() 
+            if(copyImg):
+                self.img = img.copy()
+            else:
+                self.img = img
             self.size = img.get_size()
         else:
             self.img=None
             
         self.maskSet = maskSet #does not make copies of the maskimages-must be handled at a higher level if you want to modify them
         self.maskImg = None #init current maskimage
+        self.drawn = None #the area last drawn to with drawDirty, and the images drawn there - (Rect,img,maskImg)
     
     #draws the drawable
     #screen (paygame display) - screen to draw to
     #offsetPos (tuple) - offset vector for the drawing (if necessary)
+    #returns - the area drawn to (Rect), or None if there was nothing to draw
     def draw(self,screen,offsetPos=(0,0)):
+        drawPos=(self.pos[X]+offsetPos[X],self.pos[Y]+offsetPos[Y])
+        drawRect=None
+        
         #draw the image if theres something to draw, and similar for the maskimage
         if(self.img):
-            screen.blit(self.img,(self.pos[X]+offsetPos[X],self.pos[Y]+offsetPos[Y]))
+            drawRect=screen.blit(self.img,drawPos)
         if(self.maskImg):
-            screen.blit(self.maskImg,(self.pos[X]+offsetPos[X],self.pos[Y]+offsetPos[Y]))
+            maskRect=screen.blit(self.maskImg,drawPos)
+            drawRect=drawRect.union(maskRect) if drawRect else maskRect
+        
+        return drawRect
+    
+    #draws the drawable, and works out what area of the screen looks different since it was last drawn this way (see DirtyRects)
+    #screen (paygame display) - screen to draw to
+    #offsetPos (tuple) - offset vector for the drawing (if necessary)
+    #returns - the area that changed (both where it was and where it is now), or None if nothing changed
+    def drawDirty(self,screen,offsetPos=(0,0)):
+        drawn=(self.draw(screen,offsetPos),self.img,self.maskImg)
+        
+        #same place, same images - nothing changed
+        if(self.drawn and drawn[0]==self.drawn[0] and drawn[1] is self.drawn[1] and drawn[2] is self.drawn[2]):
+            return None
+        
+        lastDrawn,self.drawn=self.drawn,drawn
+        if(lastDrawn and lastDrawn[0]):
+            return lastDrawn[0].union(drawn[0]) if drawn[0] else lastDrawn[0]
+        return drawn[0]
+    
+    #forgets where the drawable was last drawn with drawDirty - for when its not being drawn anymore
+    #returns - the area it was last drawn to, that needs clearing (Rect), or None if it wasn't drawn
+    def undraw(self):
+        lastDrawn,self.drawn=self.drawn,None
+        if(lastDrawn):
+            return lastDrawn[0]
+        return None
     
     #moves to tile a certain amount
     #change (tuple) - the vector to shift the tile
     def move(self, change):
         newPos = (self.pos[X]+change[X],self.pos[Y]+change[Y])
         self.pos = newPos
+    
+    #converts the drawables image to the displays pixel format (see convertImage)
+    def convert(self):
+        if(self.img):
+            self.img=convertImage(self.img)
 
-#A drawable, attributable Tile object, to be used on a tilemap - extends Drawable
-#attributes (dict) - a dictionary of tile attributes to assign to the tile
-#pos (tuple) - absolute position of the tile
-#img (pygame Surface) - the image for the Tile
-#maskFrames (list) - list of frames for the any visual masking that may occur
-class Tile(Drawable):
-    #initializes the tile. mostly hskpg. 
-    def __init__(self,attributes,pos=(0,0),img=None,maskFrames=None):
-        #initialize tiles attributes
-        self.setAttributes(attributes)
-        self.updateHp()
-        
-        super(Tile, self).__init__(pos,img,maskFrames) #SUPER TO DRAWABLE!
-    
-    #sets the tiles attributes (but first makes a copy)
-    #attributes (dict) - the new attributes to be set 
-    def setAttributes(self,attributes):
-        #make a copy of the attributes so they can be modifed and not affect other tiles using the same ones
-        self.attributes = attributes.copy()
-    
-    #update the tiles hp if it has a hit value
-    def updateHp(self):
-        #if the tile can be hit, init its HP
-        if (self.attributes.has_key(ATTR_HITS)):
-            self.attributes[ATTR_HP]=self.attributes[ATTR_HITS]
-    
-    #change the tile, both attributes and image
-    #newAtt (dict) - the new attributes
-    #newImg (pygame Surface) - the new image
-    def change(self,newAtt,newImg):
-        self.setAttributes(newAtt)
-        self.updateHp()
-        self.img = newImg
+#A single Tile on a tilemap - just a lightweight view of one spot in the tilemaps tile grid (the grid holds the actual data)
+#...tiles can be made and thrown away whenever, as they always read and write straight through to the tilemap
+#tilemap (TileMap) - the tilemap the tile is on
+#pos (tuple) - tile based position of the tile
+class Tile(object):
+    #initializes the tile. hskpg
+    def __init__(self,tilemap,pos):
+        self.tilemap=tilemap
+        self.pos=pos
+        self.index=tilemap.getIndex(pos) #the tiles spot in the tilemaps grid arrays
+    
+    #the tiles mine id
+    @property
+    def mineId(self):
+        return self.tilemap.ids[self.index]
+    
+    #the tiles attributes - the shared (read-only!) attributes for its type of mine
+    @property
+    def attributes(self):
+        return mines[self.tilemap.ids[self.index]]
+    
+    #the tiles current hp
+    @property
+    def hp(self):
+        return self.tilemap.hp[self.index]
+    
+    #change the tile to a different type of mine
+    #mineId (int) - the id of the new mine
+    def change(self,mineId):
+        self.tilemap.setTile(self.pos,mineId)
     
     #hit the tile for a certain amount of damage
     #dmg (int) - the amount of damage to deal to the tile
     #returns - the tiles value if it breaks, or None if you cant hit the tile
     def hit(self,dmg):
-        #if the tile has hp, hit it!
-        if (self.attributes.has_key(ATTR_HP)):
-            self.attributes[ATTR_HP]-=dmg
-
-            #if hp hits 0, reset the mask and return its value
-            if(self.attributes[ATTR_HP]<=0):
-                self.maskImg=None
-                return self.attributes[ATTR_VAL]
-            
-            #if there are mask imgs, determine which mask img to use based on the state of the hp & number of mask frames
-            if(self.maskSet):
-                #small note - cast hits to float to force float division in py2.7
-                maskState=int(len(self.maskSet)/(float(self.attributes[ATTR_HITS])/self.attributes[ATTR_HP]))
-                self.maskImg=self.maskSet[-maskState-1]    
-        
-        return None
+        return self.tilemap.hitTile(self.pos,dmg)
 
 #A list of images split up from a master image
 #imgFile (str) - name of the master imagefile
@@ -137,6 +169,7 @@ class Tile(Drawable):
 class ImageSet(list):
     #initializes the imageset - loads the imageset master image and splits it up
     def __init__(self,imgFile,imgSize,transColor=None,offset=(0,0)):
+        self.imgFile = imgFile
         self.imgSize = imgSize
         self.offset = offset
         self.transColor = transColor
@@ -146,6 +179,12 @@ class ImageSet(list):
         
         self.load()
     
+    #reloads the imageset - splits up the (possibly newly converted) master image again, in place
+    def reload(self):
+        self.img = loadImage(self.imgFile,self.transColor)
+        del self[:]
+        self.load()
+    
     #loads the imageset - splits up the master image into a list
     def load(self):
         #get the size of the master image, and the number of tiles it contains
@@ -175,6 +214,22 @@ class SpriteSet(list):
     def __init__(self,setImg,frameSize,setTemplate):
         self.setImg=setImg
         self.frameSize = frameSize
+        self.setTemplate = setTemplate
+        
+        self.load()
+    
+    #reloads the spriteset from a new (e.g. converted) image, in place
+    #setImg (pygame Surface) - the new image to split up
+    def reload(self,setImg):
+        self.setImg=setImg
+        del self[:]
+        self.load()
+    
+    #loads the spriteset - splits up the set image into frames based on the template
+    def load(self):
+        setImg=self.setImg
+        frameSize=self.frameSize
+        setTemplate=self.setTemplate
         
         #loop through each "act" in the set value template
         for act in range(0,len(setTemplate)):
@@ -201,47 +256,219 @@ class SpriteSet(list):
                         frameImg = pygame.transform.flip(frameImg,True,False)
                     
                     self[act][direction].append(frameImg) #add the final product of the frame to the spriteset
+
+#shared imagesets - (imgFile,imgSize,transColor,offset):ImageSet
+imageSets=dict()
+
+#gets the shared imageset for an image file - its only split up the first time its asked for
+#imgFile (str) - name of the master imagefile
+#imgSize (tuple) - the size of each image in the imageset
+#transColor (Color) - the color to draw transparent
+#offset (tuple) - the space between each image in the master image
+#returns - the imageset (shared, so don't modify its images!)
+def getImageSet(imgFile,imgSize,transColor=None,offset=(0,0)):
+    key=(imgFile,tuple(imgSize),tuple(transColor) if transColor else None,tuple(offset))
+    
+    if (key not in imageSets):
+        imageSets[key]=ImageSet(imgFile,imgSize,transColor,offset)
+    
+    return imageSets[key]
+
+#shared spritesets - every sprite using the same image and template shares the same frames. (imgFile,frameSize,template,transColor):SpriteSet
+spriteSets=dict()
+
+#gets the shared spriteset for an image file and template - the image is only loaded and split up the first time its asked for
+#imgFile (str) - the spriteset image file
+#frameSize (tuple) - size of each indiividual frame
+#setTemplate (3d list) - the image template
+#transColor (Color) - the color to draw transparent
+#returns - the spriteset (shared, so don't modify its frames!)
+def getSpriteSet(imgFile,frameSize,setTemplate,transColor=None):
+    #lists and colors can't be dict keys, so key on tuple copies of them
+    templateKey=tuple(tuple(tuple(direction) for direction in act) for act in setTemplate)
+    key=(imgFile,tuple(frameSize),templateKey,tuple(transColor) if transColor else None)
+    
+    if (key not in spriteSets):
+        spriteSets[key]=SpriteSet(loadImage(imgFile,transColor),frameSize,setTemplate)
+    
+    return spriteSets[key]
+
+#reloads every shared imageset and spriteset from the image cache - for after the cached images have been converted (see convertImages)
+def reloadImageSets():
+    for imageSet in imageSets.values():
+        imageSet.reload()
+    
+    for (key,spriteSet) in spriteSets.items():
+        spriteSet.reload(loadImage(key[0],key[3]))
                     
-#A "tilemap" - a 2d list (col,row) of tiles objects, and container for game sprites
+#A set of things (e.g. tile indexes) that one can be picked from at random straight away, instead of guessing until a good one comes up
+#...items are kept in a list for picking, with where each one is in the list, so removing one just swaps the last item into its spot
+#items (iterable) - the items to start with
+class CandidateSet(object):
+    #initializes the set. hskpg
+    def __init__(self,items=()):
+        self.items=list(items)
+        self.where=dict((item,i) for i,item in enumerate(self.items)) #position of each item in the list - item:index
+    
+    #adds an item to the set, if its not already in it
+    #item - the item to add
+    def add(self,item):
+        if (item not in self.where):
+            self.where[item]=len(self.items)
+            self.items.append(item)
+    
+    #removes an item from the set, if its in it
+    #item - the item to remove
+    def remove(self,item):
+        if (item in self.where):
+            i=self.where.pop(item)
+            lastItem=self.items.pop()
+            
+            #move the last item into the removed ones spot (unless it was the last one)
+            if (lastItem!=item):
+                self.items[i]=lastItem
+                self.where[lastItem]=i
+    
+    #picks a random item from the set
+    #rng (Random) - the random number generator to pick with
+    #returns - the item, or None if the set is empty
+    def choice(self,rng):
+        if (not self.items):
+            return None
+        return self.items[int(rng.random()*len(self.items))]
+    
+    def __len__(self):
+        return len(self.items)
+    
+    def __contains__(self,item):
+        return item in self.where
+
+#A "tilemap" - a grid of tiles, and container for game sprites
+#...the tiles are stored compactly - a flat (row by row) array of mine ids and one of hp, with everything else looked up from
+#...the shared mine attribute tables (MINE_TYPES, MINE_VALS, MINE_HITS) and tileset by mine id
+#template (2d list) - the mine ids for each row+column of the map
 #tileset (list) - imageset for the tiles comprising the map
 #tileSize (tuple) - the size of each tile
 #player (Miner) - the player
 #tileMaskSet (list) - an image set list for any tile masks
-class TileMap(list):
+#rng (Random) - random number generator for random positions during the game (the random module if not given)
+class TileMap(object):
     #initializes the map - creates the tilemap with actual from the given value template
-    def __init__(self, template, tileSet, tileSize, player=None,tileMaskSet=None):
+    def __init__(self, template, tileSet, tileSize, player=None,tileMaskSet=None,rng=None):
+        self.tileSet=tileSet
         self.tileSize=tileSize
+        self.tileMaskSet=tileMaskSet
         self.player = player
         self.shift=(0,0) #init the maps "shift" (how much its been scrolled)
+        self.rng=rng or random #random number generator for random positions during the game (see randomPos)
         self.mobs = list() #init list for mobs
+        self.mobCells = dict() #spatial lookup for mobs - (cellX,cellY):[mobs in that cell]
+        self.chunks = OrderedDict() #pre-rendered chunks of tiles - (chunkX,chunkY):Surface, least recently drawn first
+        self.dirtyTiles = dict() #tiles that changed since their chunk was rendered - (chunkX,chunkY):set of tile positions
+        self.flowFields = dict() #shared pathfinding flow fields - ignoreCost:FlowField
+        self.changedTiles = set() #tiles that changed since the map was last drawn (so their spot on the screen needs updating)
+        self.drawnSprites = set() #the player/mobs that were drawn last time the map was drawn
+        self.randomCandidates = dict() #tiles randomPos can pick from, for each start position used - startPos:CandidateSet of tile indexes
+        self.revision = 0 #goes up every time a tile changes type, so anything built off the map knows when its out of date
+        self.size=(len(template[0]),len(template))
         
-        #loop through each row in the template
-        for row in range(0,len(template)):
-            #create a list to hold that row
-            self.append(list())
-
-            #loop through each column (of each row) in the template
-            for col in range(0,len(template[row])):
-                #get the position and img of the tile in that row+column
-                newPos = (col*tileSize[X],row*tileSize[Y])
-                newImg = tileSet[int(template[row][col])]
-                
-                #create a new tile and add it to the minemap
-                newTile  = Tile(mines[int(template[row][col])],newPos,newImg,tileMaskSet)
-                self[row].append(newTile)
-                
-        self.size=(len(self[0]),len(self))
+        #fill the tile grid, row by row - each tile starts with the full hp for its type of mine
+        #...a numpy template (e.g. a cached level) is copied straight in
+        self.ids=array('B')
+        if (numpy and isinstance(template,numpy.ndarray)):
+            self.ids.fromstring(template.astype(numpy.uint8).tostring())
+            self.hp=array('d',numpy.array(MINE_HITS,'d')[template].tostring())
+        else:
+            for row in template:
+                self.ids.extend([int(mineId) for mineId in row])
+            self.hp=array('d',[MINE_HITS[mineId] for mineId in self.ids])
     
     #clears a particular mob
     #mobIndex - the position in the mob array to clear out
     def clearMob(self,mobIndex):
-        self.mobs.pop(mobIndex)
+        mob=self.mobs.pop(mobIndex)
+        self.unplaceMob(mob)
+    
+    #removes a particular mob from the map
+    #mob (Mob) - the mob to remove
+    def removeMob(self,mob):
+        self.mobs.remove(mob)
+        self.unplaceMob(mob)
     
     #add mobs to the map
     #mobs (list of Mob) - list of mobs to add
     def addMobs(self,mobs):
         for mob in mobs:
             self.mobs.append(mob)
+            self.placeMob(mob)
+    
+    #gets the mob lookup cell that an absolute position falls into
+    #absPos (tuple) - the absolute position
+    #returns - the cell (tuple)
+    def getCell(self,absPos):
+        return (int(absPos[X]//(self.tileSize[X]*MOB_CELL_SIZE)),int(absPos[Y]//(self.tileSize[Y]*MOB_CELL_SIZE)))
+    
+    #puts a mob into the mob lookup cell for its current position
+    #mob (Mob) - the mob to place
+    def placeMob(self,mob):
+        mob.cell=self.getCell(mob.pos)
+        self.mobCells.setdefault(mob.cell,list()).append(mob)
+    
+    #takes a mob out of its mob lookup cell
+    #mob (Mob) - the mob to take out
+    def unplaceMob(self,mob):
+        cellMobs=self.mobCells[mob.cell]
+        cellMobs.remove(mob)
+        
+        #dont keep empty cells around
+        if (not cellMobs):
+            del self.mobCells[mob.cell]
+    
+    #updates the lookup cell of a mob that has moved - must be called whenever a mob on the map changes position
+    #mob (Mob) - the mob that moved
+    def moveMob(self,mob):
+        if (self.getCell(mob.pos)!=mob.cell):
+            self.unplaceMob(mob)
+            self.placeMob(mob)
+    
+    #gets all of the mobs on the map within range of a position - only the mob lookup cells overlapping the range are looked at
+    #pos (tuple) - tile based position to look around
+    #rangeDist (int) - the range threshold (in tiles) - mobs closer than this are in range
+    #returns - list of the mobs in range
+    def getMobsInRange(self,pos,rangeDist):
+        #the cells covering the range (+1 tile each way, as a mobs tile position can round up past its cell while its walking)
+        firstCell=self.getCell(((pos[X]-rangeDist-1)*self.tileSize[X],(pos[Y]-rangeDist-1)*self.tileSize[Y]))
+        lastCell=self.getCell(((pos[X]+rangeDist+1)*self.tileSize[X],(pos[Y]+rangeDist+1)*self.tileSize[Y]))
+        rangeSq=rangeDist*rangeDist
+        
+        mobsInRange=list()
+        for cellY in range(firstCell[Y],lastCell[Y]+1):
+            for cellX in range(firstCell[X],lastCell[X]+1):
+                for mob in self.mobCells.get((cellX,cellY),()):
+                    mobPos=mob.getPos()
+                    diffX=mobPos[X]-pos[X]
+                    diffY=mobPos[Y]-pos[Y]
+                    if (diffX*diffX+diffY*diffY<rangeSq):
+                        mobsInRange.append(mob)
+        
+        return mobsInRange
+    
+    #gets all of the mobs on the map at exactly an absolute position (e.g. standing on the same spot as the player)
+    #absPos (tuple) - the absolute position
+    #returns - list of the mobs at that position
+    def getMobsAt(self,absPos):
+        return [mob for mob in self.mobCells.get(self.getCell(absPos),()) if mob.pos==absPos]
+    
+    #gets the range of tiles visible on a screen with the current map shift
+    #screenSize (tuple) - the size of the screen being drawn to
+    #returns - tuple of the (first col, first row, last col, last row) visible, all inclusive and clamped to the map
+    def getVisibleRange(self,screenSize):
+        firstCol=max(0,int(math.floor(-self.shift[X]*1.0/self.tileSize[X])))
+        firstRow=max(0,int(math.floor(-self.shift[Y]*1.0/self.tileSize[Y])))
+        lastCol=min(self.size[X]-1,int(math.floor((screenSize[X]-self.shift[X])*1.0/self.tileSize[X])))
+        lastRow=min(self.size[Y]-1,int(math.floor((screenSize[Y]-self.shift[Y])*1.0/self.tileSize[Y])))
+        
+        return (firstCol,firstRow,lastCol,lastRow)
     
     #attempts to "move" the map (shift its position on the screen)
     #shift (tuple) - the amount to move
@@ -251,82 +478,371 @@ class TileMap(list):
     def move(self,shift,overScroll=(0,0),min=None,max=None):
         #adjusts shift vector based on bounds for shifting
         if (min): #minumum bound
-            if (self[0][0].pos[Y]+self.shift[Y]>=min[Y] and shift[Y]>self.shift[Y]):
+            if (self.shift[Y]>=min[Y] and shift[Y]>self.shift[Y]):
                 shift=(shift[X],0)
-            if (self[0][0].pos[X]+self.shift[X]>=min[X] and shift[X]>self.shift[X]):
+            if (self.shift[X]>=min[X] and shift[X]>self.shift[X]):
                 shift=(0,shift[Y])
         
         if (max): #maximum bound
-            if (self[-1][-1].pos[Y]+self.shift[Y]+self.tileSize[Y]<=max[Y]+overScroll[Y] and shift[Y]<self.shift[Y]):
+            absSize=self.getAbsSize()
+            if (absSize[Y]+self.shift[Y]<=max[Y]+overScroll[Y] and shift[Y]<self.shift[Y]):
                 shift=(shift[X],-self.size[Y]*self.tileSize[Y]+max[Y])
-            if (self[-1][-1].pos[X]+self.shift[X]+self.tileSize[X]<=max[X]+overScroll[X] and shift[X]<self.shift[X]):
+            if (absSize[X]+self.shift[X]<=max[X]+overScroll[X] and shift[X]<self.shift[X]):
                 shift=(-self.size[X]*self.tileSize[X]+max[X],shift[Y])
                 
         self.shift = (shift[X],shift[Y])
     
-    #draws the map, row by row, column by column. also draws the player and any mobs on the map
+    #gets the index of a tile position in the tile grid arrays
+    #pos (tuple) - tile based position
+    #returns - the index (int)
+    def getIndex(self,pos):
+        return pos[Y]*self.size[X]+pos[X]
+    
+    #checks if a tile position is actually on the map
+    #pos (tuple) - tile based position
+    #returns - true if its on the map, false otherwise
+    def onMap(self,pos):
+        return (pos[X]>=0 and pos[X]<self.size[X] and pos[Y]>=0 and pos[Y]<self.size[Y])
+    
+    #gets the mine id of the tile at a position
+    #pos (tuple) - tile based position
+    def getId(self,pos):
+        return self.ids[pos[Y]*self.size[X]+pos[X]]
+    
+    #gets the type (MINE_BLOCK_FULL,MINE_DIGGABLE,etc) of the tile at a position
+    #pos (tuple) - tile based position
+    def getType(self,pos):
+        return MINE_TYPES[self.ids[pos[Y]*self.size[X]+pos[X]]]
+    
+    #changes the tile at a position to a different type of mine (with full hp)
+    #pos (tuple) - tile based position
+    #mineId (int) - the id of the new mine
+    def setTile(self,pos,mineId):
+        index=self.getIndex(pos)
+        
+        #keep the random position candidates up to date, if the tile is gaining or losing its value
+        if ((MINE_VALS[mineId]>0)!=(MINE_VALS[self.ids[index]]>0)):
+            for startPos,candidates in self.randomCandidates.items():
+                if (pos[X]>=startPos[X] and pos[Y]>=startPos[Y]):
+                    if (MINE_VALS[mineId]>0):
+                        candidates.add(index)
+                    else:
+                        candidates.remove(index)
+        
+        self.ids[index]=mineId
+        self.hp[index]=MINE_HITS[mineId]
+        self.revision+=1
+        self.redrawTile(pos)
+    
+    #hits the tile at a position for a certain amount of damage
+    #pos (tuple) - tile based position
+    #dmg (int) - the amount of damage to deal to the tile
+    #returns - the tiles value if it breaks, or None if you cant hit the tile
+    def hitTile(self,pos,dmg):
+        index=self.getIndex(pos)
+        mineId=self.ids[index]
+        
+        #if the tile has hp, hit it!
+        if (MINE_HITS[mineId]):
+            self.hp[index]-=dmg
+            self.redrawTile(pos) #cracks (mask) may have changed
+            
+            #its cheaper to dig through now, so any flow field pathing through it is out of date
+            for field in self.flowFields.values():
+                field.tileHit(pos)
+            
+            #if hp hits 0, return its value
+            if (self.hp[index]<=0):
+                return MINE_VALS[mineId]
+        
+        return None
+    
+    #gets the mask image (cracks!) for the tile at an index, based on how hit its been
+    #index (int) - the index of the tile in the tile grid
+    #returns - the mask image, or None if it shouldnt have one
+    def getMaskImg(self,index):
+        hits=MINE_HITS[self.ids[index]]
+        hp=self.hp[index]
+        
+        #only tiles that have been hit, but aren't broken yet get a mask
+        if (self.tileMaskSet and hits and 0<hp<hits):
+            #small note - cast hits to float to force float division in py2.7
+            maskState=int(len(self.tileMaskSet)/(float(hits)/hp))
+            return self.tileMaskSet[-maskState-1]
+        
+        return None
+    
+    #draws a single tile (and its mask, if it has one)
+    #screen (pygame Surface) - the surface to draw to
+    #pos (tuple) - tile based position of the tile to draw
+    #offsetPos (tuple) - offset vector for the drawing
+    def drawTile(self,screen,pos,offsetPos=(0,0)):
+        index=self.getIndex(pos)
+        drawPos=(pos[X]*self.tileSize[X]+offsetPos[X],pos[Y]*self.tileSize[Y]+offsetPos[Y])
+        
+        screen.blit(self.tileSet[self.ids[index]],drawPos)
+        
+        maskImg=self.getMaskImg(index)
+        if (maskImg):
+            screen.blit(maskImg,drawPos)
+    
+    #tells the map a tile looks different - if its chunk has already been rendered, the tile gets redrawn onto it next time its drawn
+    #pos (tuple) - tile based position of the tile that changed
+    def redrawTile(self,pos):
+        chunkPos=(pos[X]/MAP_CHUNK_SIZE,pos[Y]/MAP_CHUNK_SIZE)
+        self.changedTiles.add(pos)
+        
+        if (chunkPos in self.chunks):
+            self.dirtyTiles.setdefault(chunkPos,set()).add(pos)
+    
+    #gets the pre-rendered image of a chunk of tiles, rendering the whole chunk or just its changed tiles if necessary
+    #chunkPos (tuple) - the position of the chunk (in chunks, not tiles)
+    #returns - the chunks image (pygame Surface)
+    def getChunk(self,chunkPos):
+        chunkOffset=(-chunkPos[X]*MAP_CHUNK_SIZE*self.tileSize[X],-chunkPos[Y]*MAP_CHUNK_SIZE*self.tileSize[Y])
+        
+        #if the chunk has been rendered already, move it to the back of the line and redraw any tiles that changed since
+        if (chunkPos in self.chunks):
+            chunkImg=self.chunks.pop(chunkPos)
+            self.chunks[chunkPos]=chunkImg
+            
+            for pos in self.dirtyTiles.pop(chunkPos,()):
+                #clear out the old tile first, incase the new one has transparent bits
+                chunkImg.fill(Color(0,0,0),(pos[X]*self.tileSize[X]+chunkOffset[X],pos[Y]*self.tileSize[Y]+chunkOffset[Y],self.tileSize[X],self.tileSize[Y]))
+                self.drawTile(chunkImg,pos,chunkOffset)
+        
+        #otherwise render the whole chunk (chunks on the right/bottom edges of the map are cut down to fit)
+        else:
+            firstCol,firstRow=chunkPos[X]*MAP_CHUNK_SIZE,chunkPos[Y]*MAP_CHUNK_SIZE
+            lastCol,lastRow=min(firstCol+MAP_CHUNK_SIZE,self.size[X]),min(firstRow+MAP_CHUNK_SIZE,self.size[Y])
+            
+            chunkImg=pygame.Surface(((lastCol-firstCol)*self.tileSize[X],(lastRow-firstRow)*self.tileSize[Y]))
+            chunkImg.fill(Color(0,0,0))
+            for row in range(firstRow,lastRow):
+                for col in range(firstCol,lastCol):
+                    self.drawTile(chunkImg,(col,row),chunkOffset)
+            
+            self.chunks[chunkPos]=chunkImg
+            
+            #throw out the least recently drawn chunk if there are too many around
+            if (len(self.chunks)>MAP_CHUNK_CACHE):
+                oldPos=self.chunks.popitem(last=False)[0]
+                self.dirtyTiles.pop(oldPos,None)
+        
+        return chunkImg
+    
+    #draws the map, chunk by chunk. also draws the player and any mobs on the map
+    #only the chunks and mob cells that are on the screen are ever looked at, so drawing doesn't slow down on bigger maps
     #screen - the screen to draw to
+    #returns - list of the areas of the screen that changed since the map was last drawn (Rects), as long as the map hasn't scrolled since
     def draw(self,screen):
-        #draw tile row by row, column by column
-        for row in self:
-            for tile in row:
-                #make sure the tile is visible (in the screen area) before drawing it
-                if (tile.pos[X]+self.shift[X]>=-self.tileSize[X] and tile.pos[X]+self.shift[X]<=screen.get_width()):
-                    if (tile.pos[Y]+self.shift[Y]>=-self.tileSize[Y] and tile.pos[Y]+self.shift[Y]<=screen.get_height()):
-                        tile.draw(screen,self.shift)
+        (firstCol,firstRow,lastCol,lastRow)=self.getVisibleRange(screen.get_size())
+        
+        #draw the pre-rendered chunks covering the visible tiles
+        for chunkY in range(firstRow/MAP_CHUNK_SIZE,lastRow/MAP_CHUNK_SIZE+1):
+            for chunkX in range(firstCol/MAP_CHUNK_SIZE,lastCol/MAP_CHUNK_SIZE+1):
+                screen.blit(self.getChunk((chunkX,chunkY)),
+                            (chunkX*MAP_CHUNK_SIZE*self.tileSize[X]+self.shift[X],chunkY*MAP_CHUNK_SIZE*self.tileSize[Y]+self.shift[Y]))
 
+        changed=list()
+        sprites=set()
+        
         #make sure the player is visible (in the screen area) before drawing it
         if (self.player.getPos()[X]>=-self.tileSize[X] and self.player.getPos()[X]<=screen.get_width()):
             if (self.player.getPos()[Y]>=-self.tileSize[Y] and self.player.getPos()[Y]<=screen.get_height()):
                 #draw the player
-                self.player.draw(screen,self.shift)
+                changed.append(self.player.drawDirty(screen,self.shift))
+                sprites.add(self.player)
         
-        #loop through and draw each mob
-        for mob in self.mobs:
-            #make sure mob is visible (in screen area) before drawing it
-            if (mob and mob.getPos()[X]>=-self.tileSize[X] and mob.getPos()[X]<=screen.get_width()):
-                if (mob.getPos()[Y]>=-self.tileSize[Y] and mob.getPos()[Y]<=screen.get_height()):
+        #loop through the mob cells overlapping the visible tiles (+1 cell each way for mobs walking between cells) and draw each mob
+        firstCell=self.getCell((firstCol*self.tileSize[X],firstRow*self.tileSize[Y]))
+        lastCell=self.getCell((lastCol*self.tileSize[X],lastRow*self.tileSize[Y]))
+        for cellY in range(firstCell[Y]-1,lastCell[Y]+2):
+            for cellX in range(firstCell[X]-1,lastCell[X]+2):
+                for mob in self.mobCells.get((cellX,cellY),()):
                     #draw the mob
-                    mob.draw(screen,self.shift)   
+                    changed.append(mob.drawDirty(screen,self.shift))
+                    sprites.add(mob)
+        
+        #anything drawn last time but not this time (went off screen or off the map) needs to be cleared off the screen
+        for sprite in self.drawnSprites-sprites:
+            changed.append(sprite.undraw())
+        self.drawnSprites=sprites
+        
+        #and any tiles that changed
+        for pos in self.changedTiles:
+            changed.append(Rect(pos[X]*self.tileSize[X]+self.shift[X],pos[Y]*self.tileSize[Y]+self.shift[Y],self.tileSize[X],self.tileSize[Y]))
+        self.changedTiles.clear()
+        
+        return [rect for rect in changed if rect]
     
     #get a tile at a particular position (tile based)
     #pos - tile based position
-    #returns - the tile at that position
+    #returns - the tile at that position, or None if its not on the map
     def getTile(self,pos):
-        try:
-            return self[pos[Y]][pos[X]]
-        except IndexError:
-            print str(pos[Y]) + " " + str(pos[X]) + " " + str(len(self)) + " " + str(len(self[len(self)-1]))
+        if (self.onMap(pos)):
+            return Tile(self,pos)
+        
+        print str(pos[Y]) + " " + str(pos[X]) + " " + str(self.size[Y]) + " " + str(self.size[X])
+        return None
     
     #gets the absolute size of the map
     def getAbsSize(self):
-        return (len(self[0])*self.tileSize[X],len(self)*self.tileSize[Y])
+        return (self.size[X]*self.tileSize[X],self.size[Y]*self.tileSize[Y])
+    
+    #gets the flow field (pathfinding) for the map - one is shared by every mob that paths the same way
+    #ignoreCost (bool) - true for mobs that don't have to dig through tiles (ghosts)
+    #returns - the flow field
+    def getFlowField(self,ignoreCost=False):
+        if (ignoreCost not in self.flowFields):
+            self.flowFields[ignoreCost]=FlowField(self,FLOW_RANGE,ignoreCost)
+        
+        return self.flowFields[ignoreCost]
     
     #gets the 4 surrounding tiles of a given pos
     #pos (tuple) - the position to get surrounding tiles from (tile based)
-    #returns - list of surrounding tiles, or None if there was an error
+    #returns - list of surrounding tiles (in order of R L U D), or None if any of them are off the map
     def getNearTiles(self,pos):
-        #FIX - unknown bug here that i cant consistently reproduce (tries to access a tile that isnt on the map?).
-        #...just return null if it arises. works well enough
-        try:
-            #in order of R L U D
-            return [self[pos[Y]][pos[X]+1],self[pos[Y]][pos[X]-1],self[pos[Y]-1][pos[X]],self[pos[Y]+1][pos[X]]]
-        except IndexError:
+        nearPos=[(pos[X]+1,pos[Y]),(pos[X]-1,pos[Y]),(pos[X],pos[Y]-1),(pos[X],pos[Y]+1)]
+        for near in nearPos:
+            if (not self.onMap(near)):
+                return None
+        
+        return [Tile(self,near) for near in nearPos]
+    
+    #gets the types of the 4 surrounding tiles of a given pos - straight from the tile grid, for the AI
+    #pos (tuple) - the position to get surrounding tile types from (tile based)
+    #returns - list of surrounding tile types (in order of R L U D), or None if any of them are off the map
+    def getNearTypes(self,pos):
+        if (pos[X]<1 or pos[X]>=self.size[X]-1 or pos[Y]<1 or pos[Y]>=self.size[Y]-1):
             return None
+        
+        index=self.getIndex(pos)
+        ids=self.ids
+        return [MINE_TYPES[ids[index+1]],MINE_TYPES[ids[index-1]],MINE_TYPES[ids[index-self.size[X]]],MINE_TYPES[ids[index+self.size[X]]]]
     
     #gets a random position on the tilemap, starting from a given starting position (random pos > startPos)
+    #...its picked straight from the tiles that are allowed (see getRandomCandidates), so it takes the same time however few there are
     # startPos (tuple) - the first position that random positions are allowed
+    # rng (Random) - the random number generator to use (e.g. for generating the level), otherwise the maps own one is used
     #returns - the random pos
-    def randomPos(self,startPos=(0,0)):
-        randPos=(-1,-1) 
+    def randomPos(self,startPos=(0,0),rng=None):
+        if (not rng):
+            rng=self.rng
+        
+        index=self.getRandomCandidates(startPos).choice(rng)
+        if (index is None):
+            raise ValueError("no tiles with value at or after " + str(startPos) + " to pick a random position from")
+        
+        return (index%self.size[X],index/self.size[X])
+    
+    #gets the tiles that random positions can be picked from - tiles that aren't less than the starting position and have a value
+    #(no aboveground, blocked or winning tile). theyre found the first time each starting position is used, then kept up to date by setTile
+    # startPos (tuple) - the first position that random positions are allowed
+    #returns - CandidateSet of the tiles indexes
+    def getRandomCandidates(self,startPos):
+        startPos=tuple(startPos)
+        
+        if (startPos not in self.randomCandidates):
+            ids=self.ids
+            self.randomCandidates[startPos]=CandidateSet(index for row in range(max(0,startPos[Y]),self.size[Y])
+                                                               for index in range(row*self.size[X]+max(0,startPos[X]),(row+1)*self.size[X])
+                                                               if MINE_VALS[ids[index]]>0)
+        
+        return self.randomCandidates[startPos]
+        
+#A flow field for pathfinding towards a single target on a tilemap - a (bounded) dijkstra search out from the targets tile that
+#leaves every tile around it knowing which direction to step in to get to the target the cheapest way. its only rebuilt when the
+#target moves to a new tile or a tile in it changes (type or hp), and then any number of mobs can look up their direction for free
+#tilemap (TileMap) - the tilemap to path on
+#fieldRange (int) - how far (in tiles, each way) from the target the field reaches
+#ignoreCost (bool) - if true, every passable tile costs the same (for ghosts, which move straight through diggable tiles)
+class FlowField(object):
+    #initializes the flow field. hskpg
+    def __init__(self,tilemap,fieldRange,ignoreCost=False):
+        self.tilemap=tilemap
+        self.fieldRange=fieldRange
+        self.ignoreCost=ignoreCost
+        self.targetPos=None #the target tile the field was last built for
+        self.revision=None #the tilemaps revision when the field was last built
+        self.dirs=dict() #direction to step in from each tile - tile index:direction
+    
+    #rebuilds the field if the target has moved to a different tile or the map has changed since it was last built
+    #targetPos (tuple) - tile based position of the target
+    #returns - true if the field was rebuilt, false otherwise
+    def update(self,targetPos):
+        if (targetPos==self.targetPos and self.tilemap.revision==self.revision):
+            return False
+        
+        self.targetPos=targetPos
+        self.revision=self.tilemap.revision
+        self.build(targetPos)
+        return True
+    
+    #marks the field as needing to be rebuilt if a tile it covers was hit (tile hp only counts when the field isn't ignoring cost)
+    #...tiles changing type bump the tilemaps revision instead, but hits are too common to rebuild every field for
+    #pos (tuple) - tile based position of the tile that was hit
+    def tileHit(self,pos):
+        if (self.ignoreCost or self.targetPos is None):
+            return
+        
+        if (abs(pos[X]-self.targetPos[X])<=self.fieldRange and abs(pos[Y]-self.targetPos[Y])<=self.fieldRange):
+            self.revision=None
+    
+    #builds the field - searches outwards from the target, cheapest tiles first, recording for each tile reached which way leads back
+    #targetPos (tuple) - tile based position of the target
+    def build(self,targetPos):
+        tilemap=self.tilemap
+        ids=tilemap.ids
+        hp=tilemap.hp
+        width=tilemap.size[X]
+        self.dirs=dirs=dict()
+        
+        #if the target is somewhere mobs can't path to (e.g. outside), theres no field
+        if (not tilemap.onMap(targetPos) or tilemap.getType(targetPos) in FLOW_BLOCKED):
+            return
+        
+        #the box around the target the field covers
+        minX=max(0,targetPos[X]-self.fieldRange)
+        maxX=min(tilemap.size[X]-1,targetPos[X]+self.fieldRange)
+        minY=max(0,targetPos[Y]-self.fieldRange)
+        maxY=min(tilemap.size[Y]-1,targetPos[Y]+self.fieldRange)
         
-        #keep regenerating positions until its not less than the starting Position and the tile has a value (no aboveground, blocked or winning tile)
-        while(randPos[X]<startPos[X] or randPos[Y]<startPos[Y]
-              or not self.getTile(randPos).attributes[ATTR_VAL]>0):
-            randPos=(random.randint(0,self.size[X]-1),random.randint(0,self.size[Y]-1))
-                        
-        return randPos
+        start=tilemap.getIndex(targetPos)
+        costs={start:0}
+        openTiles=[(0,start)]
         
+        while (openTiles):
+            cost,index=heappop(openTiles)
+            if (cost>costs[index]):
+                continue #already found a cheaper way here
+            
+            #the cost for a mob to step onto this tile (walk + dig through whatevers left of it)
+            if (self.ignoreCost):
+                stepCost=cost+FLOW_WALK_COST
+            else:
+                stepCost=cost+FLOW_WALK_COST+hp[index]*FLOW_DIG_COST
+            
+            #each neighbour, and the direction a mob on that neighbour would step in to get here
+            (tileX,tileY)=(index%width,index/width)
+            for (nearX,nearY,direction) in ((tileX-1,tileY,DIR_RIGHT),(tileX+1,tileY,DIR_LEFT),(tileX,tileY+1,DIR_UP),(tileX,tileY-1,DIR_DOWN)):
+                if (nearX<minX or nearX>maxX or nearY<minY or nearY>maxY):
+                    continue
+                
+                near=nearY*width+nearX
+                if (MINE_TYPES[ids[near]] in FLOW_BLOCKED or (near in costs and costs[near]<=stepCost)):
+                    continue
+                
+                costs[near]=stepCost
+                dirs[near]=direction
+                heappush(openTiles,(stepCost,near))
+    
+    #gets the direction to step in from a position to head towards the target
+    #absPos (tuple) - the absolute position to step from
+    #returns - the direction, or None if the position isn't in the field
+    def getDir(self,absPos):
+        return self.dirs.get(self.tilemap.getIndex((int(absPos[X]/self.tilemap.tileSize[X]),int(absPos[Y]/self.tilemap.tileSize[Y]))))
+
 #A map template reader that reads a map template from an external file and puts it into a 2d list
 #mapFile (str) - name of the external map file (each row on a new line)
 #dlim (str) - the delimieter for the columns in the mapfile
@@ -354,37 +870,69 @@ class mapReader(list):
 #a map template that is generated at (weighted) random from a list of possible map tiles and then put it into a 2d list
 #size (tuple) - the size of the desired random map template (x,y)
 #tileTemplates (dict) - a dictionary holding many different tile variables (chance to be used,type of tile, etc etc)
+#defaultTile - the tile to use when a tile that can't be picked (no chance) comes up
+#seed (int) - seed for generating the map - the same seed always makes the same map (if None, the seed is taken from the random module)
 class randomMapTemplate(list):
     #intializes the tilemap - randomly places tiles using a weighted algorithm
-    def __init__(self,size,tileTemplates,defaultTile):
+    #...every tile is one random roll looked up in a table of all the possible rolls (see chanceTable). all the rolls come from
+    #...one random.Random stream (see rollTiles), so the same seed makes the same map with or without numpy
+    def __init__(self,size,tileTemplates,defaultTile,seed=None):
         self.size=size
         
-        #for weighted random item selection algorithm - sums up total chance
-        chanceSum = 0
-        for cs in tileTemplates.keys():
-            chanceSum+=tileTemplates[cs][ATTR_CHANCE]
-
-        #create the random tilemap, row by row, col by col
-        for row in range(0,self.size[Y]):
-            self.append(list())
-            
-            for col in range(0,self.size[X]):
-                rnd = random.randint(0,chanceSum) #generate the random tilevalue based on the weighted chance
-                lowest=0
-                
-                #loop through each tile in the tile templates to determine if the random chance has selected it
-                for c in tileTemplates.keys():
-                    chance = tileTemplates[c][ATTR_CHANCE]
-                    if(rnd<chance): #if so, exit the loop
-                        break
-                    rnd-=chance
-                
-                #if the tile came upon is actually "chanceable", add it to the template  (FIXED)
-                if (chance!=0):
-                    self[row].append(c)
-                else: #otherwise add the defaultTile
-                    self[row].append(defaultTile)
-            
+        if (seed is None):
+            seed=random.getrandbits(32)
+        self.seed=seed
+        
+        table=self.chanceTable(tileTemplates,defaultTile)
+        words=self.rollTiles(random.Random(seed),self.size[X]*self.size[Y])
+        
+        #if numpy is around, look up every tile in the table at once (each roll is scaled from 32 bits down to the table size)
+        if (numpy):
+            rolls=(words.astype(numpy.uint64)*numpy.uint64(len(table)))>>numpy.uint64(32)
+            self.extend(numpy.array(table)[rolls.reshape(self.size[Y],self.size[X])].tolist())
+        
+        #otherwise create the random tilemap, row by row, col by col
+        else:
+            for row in range(0,self.size[Y]):
+                self.append([table[(w*len(table))>>32] for w in words[row*self.size[X]:(row+1)*self.size[X]]])
+    
+    #rolls a random 32 bit word for every tile - the next count words of rng.getrandbits(32), in order
+    #...with numpy, the rngs state is copied into a numpy generator (both are the same Mersenne Twister) to roll them all at once,
+    #...then copied back, so rng ends up in the same place either way
+    #rng (Random) - the random number generator to roll with
+    #count (int) - the number of tiles to roll for
+    #returns - the rolls (numpy array of uint32 with numpy, list of ints without)
+    def rollTiles(self,rng,count):
+        if (not numpy):
+            return [rng.getrandbits(32) for i in range(0,count)]
+        
+        (version,state,gauss)=rng.getstate()
+        numpyRng=numpy.random.RandomState()
+        numpyRng.set_state(('MT19937',numpy.array(state[:-1],numpy.uint32),state[-1]))
+        words=numpyRng.randint(0,2**32,count,numpy.uint32)
+        
+        (name,key,pos,hasGauss,cachedGauss)=numpyRng.get_state()
+        rng.setstate((version,tuple(int(k) for k in key)+(pos,),gauss))
+        return words
+    
+    #makes the lookup table for picking random tiles - the tile picked for each possible roll of 0 to the total chance of all the tiles
+    #...each tile fills as many spots as its chance, in order. the very last roll gets the last tile (or the defaultTile if it has no chance)
+    #tileTemplates (dict) - see above
+    #defaultTile - see above
+    #returns - list of tiles, one for each possible roll
+    def chanceTable(self,tileTemplates,defaultTile):
+        table=list()
+        for c in tileTemplates.keys():
+            table+=[c]*tileTemplates[c][ATTR_CHANCE]
+        
+        #if the last tile is actually "chanceable", it gets the last roll. otherwise the defaultTile does (FIXED)
+        lastTile=tileTemplates.keys()[-1]
+        if (tileTemplates[lastTile][ATTR_CHANCE]!=0):
+            table.append(lastTile)
+        else:
+            table.append(defaultTile)
+        
+        return table
 
     #sets the border of the tilemap template to a particular value
     #borderVal - the value to set the border to
@@ -412,9 +960,10 @@ class randomMapTemplate(list):
 #pos - the original position for the miner
 #spriteset - the imageset to be used for the miner
 #stats (dict) - various stats for the miner
+#now (int) - the current simulation time (ms), for the animation timers
 class Miner(Drawable):
     #initializes the miner, creating any necessary stats and animation variables.
-    def __init__(self,pos,spriteset,stats):
+    def __init__(self,pos,spriteset,stats,now=0):
         #setup basic state variables
         self.dir = DIR_RIGHT
         self.act = ACT_NONE
@@ -430,11 +979,11 @@ class Miner(Drawable):
         
         #get the absolute position of the miner (framesize*given pos)
         absPos = (pos[X]*self.spriteset.frameSize[X],pos[Y]*self.spriteset.frameSize[Y])
-        super(Miner, self).__init__(absPos,spriteset[self.act][self.dir][self.frame])
+        super(Miner, self).__init__(absPos,spriteset[self.act][self.dir][self.frame],copyImg=False) #the miners image is always just one of its spritesets frames
         
         #setup antimation-related timer variables
-        self.lastMod = pygame.time.get_ticks()
-        self.maskMod = pygame.time.get_ticks()
+        self.lastMod = now
+        self.maskMod = now
         
         #update the players overall stats (bag size, delay time, etc)
         self.updateStats()
@@ -529,15 +1078,16 @@ class Miner(Drawable):
             self.updateStats() #update the complex stats
     
     #updates the player - basically a handler for the animation logic
+    #now (int) - the current simulation time (ms)
     #returns - act (int) if the miner has completed his action/animation
     #        - step distance (tuple) if the miner has moved but didnt complete the act
     #        - None otherwise
-    def update(self):
+    def update(self,now):
         returnAct = self.act
         #if the miner is currently doing something
         if (self.act>ACT_NONE):
             #try to animate. if its time...
-            if (self.animate(pygame.time.get_ticks(),self.frameDelay)):
+            if (self.animate(now,self.frameDelay)):
                 self.move(self.stepDist) #move the miner any necessary distance
                 
                 #if the action is complete (all frames been played)
@@ -579,14 +1129,15 @@ class Miner(Drawable):
         return False     
     
     #updates the mask - basically a handler for the mask animation logic
+    #now (int) - the current simulation time (ms)
     #returns true when the mask has completed animating through its frames, false until that point
-    def updateMask(self,maskSet,frameDelay):
+    def updateMask(self,maskSet,frameDelay,now):
         #if this is a new maskSet, store it
         if(self.maskSet!=maskSet):
             self.maskSet=maskSet
         
         #try to animate the mask - when its done, return success   
-        if (self.animateMask(pygame.time.get_ticks(),frameDelay)):
+        if (self.animateMask(now,frameDelay)):
             self.maskImg=None
             return True
         
@@ -640,19 +1191,93 @@ class Miner(Drawable):
         self.pos = absPos
         
 
+#A fixed-timestep clock for the game simulation - takes the real time that passes between frames and hands it out as fixed-length ticks,
+#so the simulation plays out the same no matter how fast (or slow) frames are being drawn
+#tickLen (int) - the length of each simulation tick (ms)
+#maxTicks (int) - the most ticks handed out for a single frame, so one slow frame can't snowball into a bunch more
+class SimClock(object):
+    #initializes the clock. hskpg
+    def __init__(self,tickLen,maxTicks):
+        self.tickLen=tickLen
+        self.maxTicks=maxTicks
+        self.time=0 #current simulation time (ms)
+        self.ticks=0 #number of ticks simulated so far
+        self.lag=0 #real time (ms) that hasn't been simulated yet
+    
+    #adds real time that has passed to the clock
+    #elapsed (int) - the real time (ms) since the last frame
+    #returns - the number of ticks that need to be simulated to catch up
+    def advance(self,elapsed):
+        self.lag+=elapsed
+        numTicks=int(self.lag/self.tickLen)
+        
+        #if we're too far behind, just drop the extra time instead of trying to catch up
+        if (numTicks>self.maxTicks):
+            numTicks=self.maxTicks
+            self.lag=numTicks*self.tickLen
+        
+        self.lag-=numTicks*self.tickLen
+        return numTicks
+    
+    #moves the simulation ahead a single tick
+    #returns - the new simulation time (ms)
+    def tick(self):
+        self.ticks+=1
+        self.time+=self.tickLen
+        return self.time
+
+#A scripted stand-in for pygame.event - feeds key presses to the game so it can be played without a person (e.g. headless)
+#keys (list) - the keys to press
+#interval (int) - number of get() calls (ticks when headless) between key presses
+#rng (Random) - if given, keys are picked from the list at random using it, otherwise they are pressed in order (looping around)
+class ScriptedInput(object):
+    #initializes the scripted input. hskpg
+    def __init__(self,keys,interval=1,rng=None):
+        self.keys=keys
+        self.interval=interval
+        self.rng=rng
+        self.calls=0 #number of times events have been asked for
+        self.pressed=0 #number of keys pressed so far
+    
+    #gets the events that have "happened" since the last call - same as pygame.event.get()
+    #returns - list of events (a single key press every interval calls, otherwise nothing)
+    def get(self):
+        self.calls+=1
+        if (self.calls%self.interval!=0):
+            return []
+        
+        #choose the key to press
+        if (self.rng):
+            key=self.rng.choice(self.keys)
+        else:
+            key=self.keys[self.pressed%len(self.keys)]
+        self.pressed+=1
+        
+        return [pygame.event.Event(KEYDOWN,key=key)]
+
 #A very simple target-based AI
 #target (Miner) - the target of the AI
+#flowField (FlowField) - pathfinding for the AI to follow to its target, if any
 class AI(object):
     #intializes the AI
-    def __init__(self,target):
+    def __init__(self,target,flowField=None):
         self.target=target
+        self.flowField=flowField
 
     #based on the AI's own position in space as well as the players, and what 4 tiles are surrounding it, it will choose a direction to act towards
     #myPos (tuple) - the AI's position
-    #nearTiles (list) - the 4 tiles surrounding the AI currently
-    def chooseDir(self,myPos,nearTiles):
+    #nearTypes (list) - the types of the 4 tiles surrounding the AI currently
+    def chooseDir(self,myPos,nearTypes):
+        #follow the flow field if theres one, and it reaches this far
+        if(self.flowField):
+            self.flowField.update(self.target.getPos())
+            direction=self.flowField.getDir(myPos)
+            if(direction!=None):
+                return direction
+        
+        #otherwise just head in the general direction of the target
         #if there are "near tiles" (FIX - for bug)
-        if(nearTiles):
+        if(nearTypes):
             targetPos=self.target.pos #gets the targets position
             chkOrder=list()
             
@@ -669,7 +1294,7 @@ class AI(object):
             #check each surrounding in the "check order"
             for direction in chkOrder:
                 #check the direction to make sure its not blocked, if not, return it
-                if(nearTiles[direction].attributes[ATTR_TYPE]!=MINE_BLOCK_FULL):
+                if(nearTypes[direction]!=MINE_BLOCK_FULL):
                     return direction
             
         return DIR_LEFT #default to trying to go left - doesn't matter, AI cant move
@@ -683,14 +1308,27 @@ class Mob(Miner):
     #intializes the Miner Mob
     def __init__(self,pos,spriteset,stats,ai):
         self.ai=ai #assigns the given AI
+        self.cell=None #the tilemaps mob lookup cell the mob is in - set by the tilemap
+        self.store=None #the mob store updating the mob, if any - set by the store
+        self.slot=None #the mobs slot in its mob store
         super(Mob, self).__init__(pos,spriteset,stats) #SUPER TO MINER!
     
+    #attempts to perform an action (see Miner) - lets the mobs store know, if it has one
+    #action (int) - the action to perform
+    #dist (tuple) - the distance to be travelled during this action
+    def doAction(self,action,dist=(0,0)):
+        if (super(Mob, self).doAction(action,dist)):
+            if (self.store):
+                self.store.setAction(self)
+            return True
+        return False
+    
     #runs the AI routine - find a direction to act towards
-    #nearTiles (list) - the 4 tiles surrounding the Mob
+    #nearTypes (list) - the types of the 4 tiles surrounding the Mob
     #returns - the new direction to move in/act towards, chosen by the AI
-    def runAI(self,nearTiles):
+    def runAI(self,nearTypes):
         #AI chooses a direction based on the nearest tiles
-        newDir = self.ai.chooseDir(self.pos,nearTiles)
+        newDir = self.ai.chooseDir(self.pos,nearTypes)
         
         #if its right or left, change the mobs visual sprites direction
         if(newDir==DIR_RIGHT or newDir==DIR_LEFT):
@@ -701,9 +1339,116 @@ class Mob(Miner):
     #the mob is dying! call the mask update to animate
     #deathSet (list) - the list of frames for the death animation
     #frameDelay (int) - the delay between frames for the death animation
+    #now (int) - the current simulation time (ms)
     #returns true if the animation is complete, none otherwise
-    def dying(self,deathSet,frameDelay):
-        return self.updateMask(deathSet,frameDelay)
+    def dying(self,deathSet,frameDelay,now):
+        return self.updateMask(deathSet,frameDelay,now)
+
+#A store for updating lots of mobs at once (needs numpy) - holds the mobs animation state (positions, step distances, frames,
+#timers, acts and speed based delays) in arrays, one slot per mob, so a whole tick of Miner.update for every mob is a few array operations.
+#only the mobs that actually animated get their own attributes (pos, frame, img, etc) written back
+#mobs (list) - the mobs to store
+class MobStore(object):
+    #initializes the store, filling each mobs slot from its current state
+    def __init__(self,mobs):
+        self.mobs=list(mobs)
+        
+        self.pos=numpy.array([mob.pos for mob in self.mobs],int).reshape(len(self.mobs),2)
+        self.stepDist=numpy.zeros((len(self.mobs),2),int)
+        self.frame=numpy.array([mob.frame for mob in self.mobs],int)
+        self.numFrames=numpy.ones(len(self.mobs),int) #number of frames in each mobs current act
+        self.lastMod=numpy.array([mob.lastMod for mob in self.mobs],float)
+        self.act=numpy.array([mob.act for mob in self.mobs],int)
+        self.frameDelay=numpy.array([mob.frameDelay for mob in self.mobs],float) #(based on speed, see Miner.updateStats)
+        self.actDelay=numpy.array([mob.actDelay for mob in self.mobs],float)
+        
+        for slot in range(0,len(self.mobs)):
+            self.mobs[slot].store=self
+            self.mobs[slot].slot=slot
+            if (self.mobs[slot].act>ACT_NONE):
+                self.setAction(self.mobs[slot])
+    
+    #gets all of the stores arrays
+    def getArrays(self):
+        return [self.pos,self.stepDist,self.frame,self.numFrames,self.lastMod,self.act,self.frameDelay,self.actDelay]
+    
+    #takes a mob out of the store - the last mob in the store is moved into its slot
+    #mob (Mob) - the mob to remove
+    def remove(self,mob):
+        slot=mob.slot
+        last=len(self.mobs)-1
+        
+        #move the last mob into the removed mobs slot
+        if (slot!=last):
+            self.mobs[slot]=self.mobs[last]
+            self.mobs[slot].slot=slot
+            for column in self.getArrays():
+                column[slot]=column[last]
+        
+        #and drop the last slot
+        self.mobs.pop()
+        (self.pos,self.stepDist,self.frame,self.numFrames,self.lastMod,self.act,self.frameDelay,self.actDelay)=[column[:last] for column in self.getArrays()]
+        
+        mob.store=None
+        mob.slot=None
+    
+    #copies a mobs newly started action into its slot
+    #mob (Mob) - the mob that started acting
+    def setAction(self,mob):
+        slot=mob.slot
+        self.act[slot]=mob.act
+        self.frame[slot]=mob.frame
+        self.stepDist[slot]=mob.stepDist
+        self.numFrames[slot]=len(mob.spriteset[mob.act][mob.dir])
+    
+    #updates some of the mobs in the store (see Miner.update)
+    #now (int) - the current simulation time (ms)
+    #slots (list) - the slots of the mobs to update, in the order to update them
+    #returns - list of (mob,result) for every mob that returned something (in slot order), where result is what Miner.update would have returned
+    def update(self,now,slots):
+        #the acting mobs whose next frame is due
+        slots=numpy.array(slots,int)
+        due=slots[(self.act[slots]>ACT_NONE)&(now-self.lastMod[slots]>self.frameDelay[slots])]
+        if (not len(due)):
+            return []
+        
+        #animate them - next frame (back to 0 if theres no more frames), and move them their step distance
+        self.frame[due]+=1
+        self.frame[due[self.frame[due]>=self.numFrames[due]]]=0
+        self.lastMod[due]=now
+        self.pos[due]+=self.stepDist[due]
+        
+        #the mobs that just finished their act - delay their next act
+        done=due[self.frame[due]==0]
+        self.lastMod[done]+=self.actDelay[done]
+        
+        #write back the mobs that changed, and figure out what each of them returns
+        results=list()
+        for slot in due:
+            mob=self.mobs[slot]
+            stepDist=(int(self.stepDist[slot,X]),int(self.stepDist[slot,Y]))
+            mob.pos=(int(self.pos[slot,X]),int(self.pos[slot,Y]))
+            mob.frame=int(self.frame[slot])
+            mob.lastMod=float(self.lastMod[slot])
+            mob.updateFrame()
+            
+            #if the act is complete, reset for the next act
+            if (mob.frame==0):
+                if (stepDist!=(0,0)):
+                    results.append((mob,stepDist))
+                else:
+                    results.append((mob,mob.act))
+                mob.act=ACT_NONE
+                mob.stepDist=0
+            
+            #if we moved but didn't complete the act
+            elif (stepDist!=(0,0)):
+                results.append((mob,stepDist))
+        
+        self.act[done]=ACT_NONE
+        self.stepDist[done]=0
+        
+        return results
 
 #A UI Button object that will automatically resize itself to fit its text and can be clicked
 #name (str) - the name of the button, to help higher levels identify it when its been clicked
@@ -713,9 +1458,11 @@ class Mob(Miner):
 class Button(object):
     #intializes the button and creates the btn image necessary to fit the given text
     def __init__(self,name,pos,btnSet,textImg):
+        self.alignPos = pos #the buttons position, before any UI alignment
         self.pos = pos
         self.name = name
         self.enabled = True
+        self.window = None #the window the button is in, if any - set by the window
         
         #get required size of mid-section of button
         pnlSize=btnSet[0].get_size()
@@ -740,6 +1487,12 @@ class Button(object):
         self.img.blit(textImg,textPos)
     # image done =========================================================
     
+    #converts the buttons images to the displays pixel format (see convertImage)
+    def convert(self):
+        self.img=convertImage(self.img)
+        if(not self.enabled):
+            self.origImg=convertImage(self.origImg)
+    
     #enables the button - returning to the original img and setting the enabled flag
     #returns - true if it was disabled, false if it was already enabled
     def enable(self):
@@ -747,6 +1500,8 @@ class Button(object):
         if (not self.enabled):
             self.img=self.origImg.copy()
             self.enabled=True
+            if (self.window):
+                self.window.redraw()
             return True
         
         return False
@@ -758,17 +1513,17 @@ class Button(object):
             self.origImg = self.img.copy()
             self.enabled=False
             changeBrightness(self.img,BTN_DISABLE_RGB)
+            if (self.window):
+                self.window.redraw()
             return True
         return False
     
-    #draws the button
+    #draws the button (its position is already worked out from any UI alignment by its window - see Window.layout)
     #screen (pygame Surface) - the screen to draw to
     #offsetPos (tuple) - the position of the container on the screen
-    #window (Window) - the window container, if any
-    def draw(self,screen,offsetPos=(0,0),window=None):
-        if (window): #if its contained in a window, check/fix for any UI alignments
-            self.pos=specialPos(self.pos,window.size,self.size)
-        screen.blit(self.img,(self.pos[X]+offsetPos[X],self.pos[Y]+offsetPos[Y])) #draw the button
+    #returns - the area drawn to (Rect)
+    def draw(self,screen,offsetPos=(0,0)):
+        return screen.blit(self.img,(self.pos[X]+offsetPos[X],self.pos[Y]+offsetPos[Y])) #draw the button
     
     #determines if this button was clicked
     #mousePos (tuple) the position of the mouse click
@@ -794,12 +1549,14 @@ class Label(object):
     #initializes the label. mostly hskpg
     def __init__(self,pos,text,font,color,lineDlim=None,lineCenter=False):
         #HSKPG
+        self.alignPos=pos #the labels position, before any UI alignment
         self.pos=pos
         self.color=color
         self.font=font
         self.text=text
         self.lineDlim=lineDlim
         self.lineCenter=lineCenter
+        self.window=None #the window the label is in, if any - set by the window
         
         #creates a new label image from the given parameters
         self.newImg(textImage(text,font,color,lineDlim,lineCenter))
@@ -808,13 +1565,28 @@ class Label(object):
     #newImg (pygame Surface) - the new image for the label
     def newImg(self,newImg):
         self.img=newImg
+        
+        #its window needs redrawing, and laying out again if the labels size changed
+        if (self.window):
+            if (self.img.get_size()!=self.size):
+                self.window.relayout()
+            self.window.redraw()
         self.size=self.img.get_size()
     
+    #converts the labels image to the displays pixel format (see convertImage)
+    def convert(self):
+        self.img=convertImage(self.img)
+    
     #change some textual attribute of the label
     #text (str) - text to change to
     #font (pygame Font) - font to change to
     #color (pygame Color) - color of font to change to
+    #returns - true if the label changed, false if it was already the same (and didnt need re-rendering)
     def change(self,text=None,font=None,color=None):
+        #if nothing is actually different, theres no need to re-render anything
+        if ((text==None or text==self.text) and (font==None or font==self.font) and (color==None or color==self.color)):
+            return False
+        
         #determine which attributes of the label are being changed
         if(text):
             self.text=text
@@ -825,16 +1597,14 @@ class Label(object):
         
         #create the img from the new text, and set the new img
         self.newImg(textImage(self.text,self.font,self.color,self.lineDlim,self.lineCenter))
+        return True
     
-    #draws the label
+    #draws the label (its position is already worked out from any UI alignment by its window - see Window.layout)
     #screen (pygame Surface) - the screen to draw to
-    #offsetPos (tuple) - the offset drawing position of its container (cant be passed with container)
-    #window (Window) - the window container itself
-    def draw(self,screen,offsetPos=(0,0),window=None):
-        #makes any necessary last-minute changes to the position for spcial UI-alignment if its within a window
-        if (window):
-            self.pos=specialPos(self.pos,window.size,self.size)
-        screen.blit(self.img,(self.pos[X]+offsetPos[X],self.pos[Y]+offsetPos[Y])) 
+    #offsetPos (tuple) - the offset drawing position of its container
+    #returns - the area drawn to (Rect)
+    def draw(self,screen,offsetPos=(0,0)):
+        return screen.blit(self.img,(self.pos[X]+offsetPos[X],self.pos[Y]+offsetPos[Y])) 
 
 #A UI "Window" (message box-style) that can be clicked
 #pos (tuple) - the position of the window in its container
@@ -854,13 +1624,23 @@ class Window(object):
         self.labels=labels
         self.btns=btns
         self.imgs=imgs
+        self.alignPos=pos #the windows position, before any UI alignment
         self.pos=pos
         self.visible=True
+        self.layoutSize=None #the screen size the window was last laid out for (see layout) - None if it needs laying out again
+        self.img=None #the whole window drawn onto one image (see compose) - None if it needs redrawing
+        self.imgPos=(0,0) #the position of the windows image on the screen (see compose)
+        self.drawnRect=None #the area of the screen the window was last drawn to - None if it wasn't drawn last time
+        self.changed=True #whether the windows image changed since it was last drawn
         
         #create the panels for the window & get its overall size
         self.createPanels(numPanels)
         self.size = (self.pnlSize[X],self.pnlSize[Y]*(numPanels + 2)) #+2 to always inlude top and bottom
         
+        #let the labels and buttons know which window they're in, so they can tell it when they change
+        for element in (self.labels or [])+(self.btns or []):
+            element.window=self
+        
     #creates the necessary panels and appends them to a list (always top and bottom + 1 if theres a title + numPanels)
     #numPanels (int) - see above equation
     def createPanels(self,numPanels):
@@ -877,52 +1657,116 @@ class Window(object):
             
         self.panels.append(self.winSet[WINSET_IMG_BTM]) #add bottom panel (window border)
     
+    #converts everything in the window to the displays pixel format (see convertImage)
+    #...the panels are re-taken from the windows imageset, so that needs to be reloaded first (see reloadImageSets)
+    def convert(self):
+        self.panels=[self.winSet[WINSET_IMG_TOP]]+[self.winSet[WINSET_IMG_PNL]]*(len(self.panels)-2)+[self.winSet[WINSET_IMG_BTM]]
+        
+        if(self.title):
+            self.title=convertImage(self.title)
+        
+        for element in (self.labels or [])+(self.btns or [])+(self.imgs or []):
+            element.convert()
+        
+        self.redraw()
+    
+    #lays out the window - works out the actual positions of the window and everything in it from their UI alignments (see specialPos)
+    #...only done when its on a different size of screen or something in it changed size, instead of every time its drawn or clicked
+    #screenSize (tuple) - the size of the screen the window is on
+    def layout(self,screenSize):
+        if (self.layoutSize==screenSize):
+            return
+        
+        self.pos=specialPos(self.alignPos,screenSize,(self.pnlSize[X],self.pnlSize[Y]*len(self.panels)))
+        for element in (self.labels or [])+(self.btns or []):
+            element.pos=specialPos(element.alignPos,self.size,element.size)
+        
+        self.layoutSize=screenSize
+        self.redraw()
+    
+    #marks the window as needing to be laid out again, next time its drawn or clicked
+    def relayout(self):
+        self.layoutSize=None
+    
+    #marks the windows image as needing to be redrawn (see compose), next time its drawn
+    #...labels and buttons do this themselves when they change - call it after changing any of the windows images
+    def redraw(self):
+        self.img=None
+    
+    #draws the panels, title, labels, buttons and images of the window onto one image, so the window is only one blit to draw
+    #...everything is put on exactly the same pixels drawing it straight to the screen would (pygame truncates fractional positions)
+    #...and blended the same way - onto an opaque image like the screen, with the panels see-through bits left as the transparent color.
+    #...(an alpha image would blend everything twice - once onto it and again onto the screen - which is a shade off)
+    def compose(self):
+        elements=[element for element in (self.labels or [])+(self.btns or [])+(self.imgs or []) if element.img]
+        
+        #get every image in the window with its position relative to the window
+        parts=[(self.panels[p],(0,p*self.pnlSize[Y])) for p in range(0,len(self.panels))]
+        if(self.title):
+            #centers the tile on the top two panels
+            parts.append((self.title,(self.pnlSize[X]/2.0 - self.title.get_width()/2.0,self.pnlSize[Y] - self.title.get_height()/2.0)))#force float divison
+        parts+=[(element.img,element.pos) for element in elements]
+        
+        #get the pixel each image would be drawn at on the screen, and the area covered by all of them
+        screenPos=[(int(self.pos[X]+pos[X]),int(self.pos[Y]+pos[Y])) for img,pos in parts]
+        area=pygame.Rect(screenPos[0],parts[0][0].get_size())
+        for (img,pos),drawPos in zip(parts,screenPos):
+            area.union_ip(pygame.Rect(drawPos,img.get_size()))
+        
+        #start with a transparent image covering the area, then draw everything to it
+        self.img=pygame.Surface(area.size)
+        self.img.fill(TILE_TRANSCOLOR)
+        self.img.set_colorkey(TILE_TRANSCOLOR)
+        self.imgPos=area.topleft
+        
+        #the panels and title
+        for (img,pos),drawPos in zip(parts,screenPos)[:len(parts)-len(elements)]:
+            self.img.blit(img,(drawPos[X]-area.left,drawPos[Y]-area.top))
+        
+        #the labels, buttons and images draw themselves (images can have masks) - offset so they end up on the same pixel
+        for element,drawPos in zip(elements,screenPos[len(parts)-len(elements):]):
+            element.draw(self.img,(drawPos[X]-area.left-element.pos[X],drawPos[Y]-area.top-element.pos[Y]))
+        
+        self.img=convertImage(self.img)
+        self.changed=True
+    
     #draws the Window and anything contained within it
     #screen - the game screen to draw to
+    #returns - the area of the screen that looks different since the window was last drawn (see DirtyRects), or None if nothing changed
     def draw(self,screen):
+        lastRect,self.drawnRect=self.drawnRect,None
+        
         #make sure window is visible before trying to draw it
         if (self.visible):
-            #perform any special UI alignment necessary for drawing
-            self.pos=specialPos(self.pos,screen.get_size(),(self.pnlSize[X],self.pnlSize[Y]*len(self.panels)))
-    
-            #draw each panel
-            for p in range(0,len(self.panels)):
-                screen.blit(self.panels[p],(self.pos[X],self.pos[Y]+p*self.pnlSize[Y]))
-            
-            #draw title if necessary
-            if(self.title):
-                #centers the tile on the top two panels
-                titlePos = (self.pnlSize[X]/2.0 - self.title.get_width()/2.0 +self.pos[X],self.pnlSize[Y] - self.title.get_height()/2.0 + self.pos[Y])#force float divison
-                screen.blit(self.title,titlePos)
+            #make sure the window is laid out for this screen, and its image is up to date
+            self.layout(screen.get_size())
+            if (not self.img):
+                self.compose()
             
-            #draw all the labels
-            if (self.labels):
-                for label in self.labels:
-                    label.draw(screen,self.pos,self)
-    
-            #draw all the buttons
-            if(self.btns):
-                for btn in self.btns:
-                    btn.draw(screen,self.pos,self)
-                    
-            #draw all the images
-            if(self.imgs):
-                for img in self.imgs:
-                    img.draw(screen,self.pos)
+            self.drawnRect=screen.blit(self.img,self.imgPos)
+        
+        #if the window looks the same and is in the same place, nothing changed
+        if (not self.changed and lastRect==self.drawnRect):
+            return None
+        
+        self.changed=False
+        if (lastRect and self.drawnRect):
+            return lastRect.union(self.drawnRect)
+        return lastRect or self.drawnRect
     
     #determines if any buttons have been clicked in the window
     #screen (pygame Surface) - the screen being clicked on
     #pos (tuple) - the position of the mouseclick
     #returns - name of button that was clicked, or false if nothing was clicked
     def click(self, screen, mousePos):
-        #check for any centering the window may partake in
-        winPos=specialPos(self.pos,screen.get_size(),(self.pnlSize[X],self.pnlSize[Y]*len(self.panels)))
+        #make sure the window is laid out for this screen
+        self.layout(screen.get_size())
         
         #first, check to see if the window is visible and has buttons before checking for clicks
         if(self.visible and self.btns):
             #loop through all tghe windows buttons to see if any were clicked
             for btn in self.btns:
-                if (btn.click(mousePos,winPos)): #if the button was clicked, return true
+                if (btn.click(mousePos,self.pos)): #if the button was clicked, return true
                     return btn.name
         #false if nothing wasnt clicked
         return False
@@ -935,4 +1779,37 @@ class Window(object):
             if btn.name==name:
                 return btn
         
-        return None
\ No newline at end of file
+        return None
+
+#Keeps track of the areas of the display that changed while drawing a frame, so only those areas have to be updated on the display
+#...the whole display gets updated instead (flipped) whenever too much has changed to bother tracking, e.g. when the map scrolls
+class DirtyRects(object):
+    #initializes the tracker - the first frame always updates the whole display
+    def __init__(self):
+        self.rects=list()
+        self.full=True #whether the whole display needs updating this frame
+    
+    #adds an area that changed
+    #rect (Rect) - the area that changed (None is ignored, so draw() results can be passed straight in)
+    def add(self,rect):
+        if (rect):
+            self.rects.append(rect)
+    
+    #adds a bunch of areas that changed
+    #rects (list) - list of the areas that changed (Rects)
+    def addAll(self,rects):
+        self.rects+=rects
+    
+    #marks the whole display as needing updating this frame
+    def fullUpdate(self):
+        self.full=True
+    
+    #updates the display - the changed areas, or the whole thing if necessary. then starts tracking the next frame
+    def update(self):
+        if (self.full):
+            pygame.display.flip()
+        elif (self.rects):
+            pygame.display.update(self.rects)
+        
+        self.rects=list()
+        self.full=False
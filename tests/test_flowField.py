@@ -0,0 +1,45 @@
+#Filename: test_flowField.py
+#Description: Tests that zombie flow fields are rebuilt when the tiles they path through change
+#run from the game folder with: python -m unittest discover tests
+
+import os, sys, random, unittest
+
+#no display or sound needed - SDL has to be told to use its dummy drivers before pygame is initialized
+os.environ["SDL_VIDEODRIVER"]="dummy"
+os.environ["SDL_AUDIODRIVER"]="dummy"
+
+#the game loads its fonts and images relative to the game folder
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+sys.path.insert(0,os.getcwd())
+
+import ZombieMiner3 as game
+from gameConstants import *
+
+class FlowFieldTest(unittest.TestCase):
+    def setUp(self):
+        template=game.randomMapTemplate((20,20),game.mines,MINE_ROCK,1)
+        template.setBorder(MINE_ROCK)
+        player=game.Miner((10,10),game.getSpriteSet(IMG_PLAYER,SPRITE_SIZE,SPRITE_TEMPLATE,TILE_TRANSCOLOR),PLAYER_STATS)
+        self.tilemap=game.TileMap(template,game.TILESET,TILE_SIZE,player,game.getImageSet(IMG_CRACKS,TILE_SIZE,TILE_TRANSCOLOR),random.Random(1))
+        self.tilemap.setTile((10,10),MINE_DUG)
+        self.field=self.tilemap.getFlowField(False)
+        self.assertTrue(self.field.update((10,10)))
+    
+    def testUpToDate(self):
+        self.assertFalse(self.field.update((10,10)))
+    
+    def testRebuiltAfterSetTile(self):
+        self.tilemap.setTile((10,11),MINE_DUG)
+        self.assertTrue(self.field.update((10,10)))
+    
+    def testRebuiltAfterHitTile(self):
+        #hitting a tile makes it cheaper to dig through, so the field has to be rebuilt
+        for pos in [(x,y) for y in range(1,19) for x in range(1,19)]:
+            if (MINE_HITS[self.tilemap.ids[self.tilemap.getIndex(pos)]]):
+                self.tilemap.hitTile(pos,1)
+                self.assertTrue(self.field.update((10,10)))
+                return
+        self.fail("no tile to hit")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#Filename: test_mobStore.py
+#Description: Tests that updating zombies all at once in a MobStore plays out the same as updating them one by one
+#run from the game folder with: python -m unittest discover tests
+
+import os, sys, random, unittest
+
+#no display or sound needed - SDL has to be told to use its dummy drivers before pygame is initialized
+os.environ["SDL_VIDEODRIVER"]="dummy"
+os.environ["SDL_AUDIODRIVER"]="dummy"
+
+#the game loads its fonts and images relative to the game folder
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+sys.path.insert(0,os.getcwd())
+
+import pygame
+import ZombieMiner3 as game
+from gameConstants import *
+
+SEED=11
+TICKS=4000
+ZOMBIE_SCALE=10 #times as many zombies as the level normally has, so theres plenty awake around the player
+
+class MobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.screen=pygame.display.set_mode(SCREEN_SIZE,0,DUMMY_DEPTH)
+        game.setSoundEnabled(False)
+    
+    #plays out the zombies on the hard level from a fixed seed, with the player stood in the middle of the map
+    #useStore (bool) - true to update the zombies in a MobStore, false to update them one by one
+    #returns - the state of the zombies, tiles and player at the end
+    def playZombies(self,useStore):
+        options=GAME_LVLS[GAME_LVL_HARD]
+        mapSize=options[GAME_OPT_MAP_SIZE]
+        aboveground=game.mapReader(MAP_FILE,MAP_FILE_DLIM)
+        
+        rng=random.Random(SEED) #the map, tilemap and zombies each get their own seed from this, like in a game
+        template=game.randomMapTemplate(mapSize,game.mines,MINE_ROCK,rng.getrandbits(32))
+        template.setBorder(MINE_ROCK)
+        template.setArea((0,0),aboveground)
+        
+        player=game.Miner((mapSize[X]/2,mapSize[Y]/2),game.getSpriteSet(IMG_PLAYER,SPRITE_SIZE,SPRITE_TEMPLATE,TILE_TRANSCOLOR),PLAYER_STATS)
+        player.stats[STAT_HP]=TICKS #so the game doesn't end part way through
+        tilemap=game.TileMap(template,game.TILESET,TILE_SIZE,player,game.getImageSet(IMG_CRACKS,TILE_SIZE,TILE_TRANSCOLOR),random.Random(rng.getrandbits(32)))
+        tilemap.setTile((mapSize[X]/2,mapSize[Y]/2),MINE_DUG)
+        game.scrollMap(self.screen,player,tilemap)
+        
+        levelRng=random.Random(rng.getrandbits(32))
+        zombies=list()
+        for zData in options[GAME_OPT_ZOMBIES]:
+            zData=zData.copy()
+            zData[GAME_OPT_ZOMBIE_NUM]*=ZOMBIE_SCALE
+            zombies=zombies+game.createZombies(zData,tilemap,SPRITE_TEMPLATE,player,(1,len(aboveground)),levelRng)
+        tilemap.addMobs(zombies)
+        mobStore=game.MobStore(zombies) if useStore else None
+        
+        fireSet=game.getSpriteSet(IMG_FIRE,SPRITE_SIZE,FIRE_TEMPLATE,TILE_TRANSCOLOR)[0][0]
+        for tick in range(0,TICKS):
+            game.handleZombies(self.screen,tilemap,zombies,player,fireSet,tick*SIM_TICK,mobStore)
+        
+        return ([(zombie.pos,zombie.dir,zombie.act,zombie.frame,zombie.lastMod) for zombie in zombies],
+                tilemap.ids.tostring(),tilemap.hp.tostring(),player.pos,player.stats[STAT_HP])
+    
+    def testSameAsOneByOne(self):
+        if (not game.numpy):
+            self.skipTest("numpy isn't installed")
+        self.assertEqual(self.playZombies(True),self.playZombies(False))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+#Filename: test_randomMapTemplate.py
+#Description: Tests that randomMapTemplate makes the same map from the same seed, with or without numpy
+#run from the game folder with: python -m unittest discover tests
+
+import os, sys, unittest
+from collections import OrderedDict
+
+#no display needed - SDL has to be told to use its dummy drivers before pygame is initialized
+os.environ["SDL_VIDEODRIVER"]="dummy"
+os.environ["SDL_AUDIODRIVER"]="dummy"
+#the game loads its fonts and images relative to the game folder
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+sys.path.insert(0,os.getcwd())
+
+import pygame
+pygame.init()
+pygame.font.init()
+
+import gameObjects
+from gameConstants import *
+
+#a small set of tiles to generate from (3 in 6 dirt, 2 in 6 rock, and the last roll goes to the default tile, gold, since it has no chance)
+TILES=OrderedDict([('d',{ATTR_CHANCE:3}),('r',{ATTR_CHANCE:2}),('g',{ATTR_CHANCE:0})])
+DEFAULT_TILE='g'
+
+class RandomMapTemplateTest(unittest.TestCase):
+    #makes a map from the test tiles, with or without numpy
+    def makeMap(self,size,seed,useNumpy):
+        numpy=gameObjects.numpy
+        if (not useNumpy):
+            gameObjects.numpy=None
+        try:
+            return gameObjects.randomMapTemplate(size,TILES,DEFAULT_TILE,seed)
+        finally:
+            gameObjects.numpy=numpy
+    
+    def testKnownMap(self):
+        self.assertEqual(self.makeMap((6,3),1234,False),
+                         [['g','r','d','d','d','d'],
+                          ['g','g','g','r','r','d'],
+                          ['r','r','d','d','r','d']])
+    
+    def testSameWithNumpy(self):
+        if (not gameObjects.numpy):
+            self.skipTest("numpy isn't installed")
+        for seed in (0,1234,2**40):
+            self.assertEqual(self.makeMap((17,11),seed,True),self.makeMap((17,11),seed,False))
+    
+    def testSameSeedSameMap(self):
+        self.assertEqual(self.makeMap((10,10),42,False),self.makeMap((10,10),42,False))
+        self.assertNotEqual(self.makeMap((10,10),42,False),self.makeMap((10,10),43,False))
+
+if __name__ == "__main__":
+    unittest.main()
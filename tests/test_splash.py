@@ -0,0 +1,33 @@
+#Filename: test_splash.py
+#Description: Tests that input during the splash screen is kept for the menu, instead of being thrown away
+#run from the game folder with: python -m unittest discover tests
+
+import os, sys, unittest
+
+#no display or sound needed - SDL has to be told to use its dummy drivers before pygame is initialized
+os.environ["SDL_VIDEODRIVER"]="dummy"
+os.environ["SDL_AUDIODRIVER"]="dummy"
+
+#the game loads its fonts and images relative to the game folder
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+sys.path.insert(0,os.getcwd())
+
+import pygame
+from pygame.locals import *
+import ZombieMiner3 as game
+from gameConstants import *
+
+class SplashTest(unittest.TestCase):
+    def testInputKept(self):
+        screen=pygame.display.set_mode(SCREEN_SIZE,0,DUMMY_DEPTH)
+        pygame.event.clear()
+        pygame.event.post(pygame.event.Event(KEYDOWN,key=K_SPACE,mod=0,unicode=u' '))
+        pygame.event.post(pygame.event.Event(MOUSEBUTTONDOWN,pos=(10,20),button=1))
+        
+        game.splash(screen,SPLASH_DELAY)
+        
+        events=[(event.type,event.dict) for event in pygame.event.get() if event.type in (KEYDOWN,MOUSEBUTTONDOWN)]
+        self.assertEqual(events,[(KEYDOWN,{'key':K_SPACE,'mod':0,'unicode':u' '}),(MOUSEBUTTONDOWN,{'pos':(10,20),'button':1})])
+
+if __name__ == "__main__":
+    unittest.main()
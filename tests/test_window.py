@@ -0,0 +1,64 @@
+#Filename: test_window.py
+#Description: Tests that a window drawn from its composed image looks exactly like drawing each of its parts straight to the screen
+#run from the game folder with: python -m unittest discover tests
+
+import os, sys, random, unittest
+
+#no display or sound needed - SDL has to be told to use its dummy drivers before pygame is initialized
+os.environ["SDL_VIDEODRIVER"]="dummy"
+os.environ["SDL_AUDIODRIVER"]="dummy"
+
+#the game loads its fonts and images relative to the game folder
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+sys.path.insert(0,os.getcwd())
+
+import pygame
+import ZombieMiner3 as game
+from gameConstants import *
+
+class WindowTest(unittest.TestCase):
+    def setUp(self):
+        self.screen=pygame.display.set_mode(SCREEN_SIZE,0,DUMMY_DEPTH)
+        game.convertDisplay()
+        
+        #a noisy background, so anything see-through or blended shows up
+        rng=random.Random(1)
+        self.background=pygame.Surface(SCREEN_SIZE).convert()
+        for x in range(0,SCREEN_SIZE[X],4):
+            for y in range(0,SCREEN_SIZE[Y],4):
+                self.background.fill((rng.randrange(256),rng.randrange(256),rng.randrange(256)),(x,y,4,4))
+    
+    #draws a window part by part straight onto the screen, the way windows were drawn before they were composed
+    def drawParts(self,win,screen):
+        win.layout(screen.get_size())
+        for p in range(0,len(win.panels)):
+            screen.blit(win.panels[p],(win.pos[X],win.pos[Y]+p*win.pnlSize[Y]))
+        if (win.title):
+            screen.blit(win.title,(win.pnlSize[X]/2.0-win.title.get_width()/2.0+win.pos[X],win.pnlSize[Y]-win.title.get_height()/2.0+win.pos[Y]))
+        for element in (win.labels or [])+(win.btns or [])+(win.imgs or []):
+            element.draw(screen,win.pos)
+    
+    def assertSameAsParts(self,win):
+        composed=self.background.copy()
+        parts=self.background.copy()
+        win.redraw()
+        win.draw(composed)
+        self.drawParts(win,parts)
+        self.assertEqual(pygame.image.tostring(composed,"RGB"),pygame.image.tostring(parts,"RGB"))
+    
+    def testWindows(self):
+        for win in (game.SHOP_WIN,game.MENU_WIN,game.LVL_WIN,game.HOW_WIN,game.createEndWin("Game Over","You have died!")):
+            self.assertSameAsParts(win)
+    
+    def testStatWindow(self):
+        player=game.Miner(PLAYER_STARTPOS,game.getSpriteSet(IMG_PLAYER,SPRITE_SIZE,SPRITE_TEMPLATE,TILE_TRANSCOLOR),PLAYER_STATS)
+        statWin=game.createStatWin(player)
+        self.assertSameAsParts(statWin)
+        
+        #and after its labels change
+        player.stats[STAT_MONEY]+=1234
+        game.updateStatWin(statWin,player)
+        self.assertSameAsParts(statWin)
+
+if __name__ == "__main__":
+    unittest.main()